@@ -2,33 +2,87 @@
 datatools-portfolio: FastAPI backend for internal DataTools platform.
 SQL-first, Supabase Postgres, audit logging, safe DDL/compare/validate.
 """
+import asyncio
+import atexit
+import hashlib
 import json
+import logging
 import os
+import queue
 import re
 import threading
-from contextlib import contextmanager
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
 from datetime import datetime, timezone, timedelta
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 import sqlglot
-from sqlglot.expressions import Create, ColumnDef
+from sqlglot.expressions import (
+    ColumnDef,
+    Create,
+    DefaultColumnConstraint,
+    NotNullColumnConstraint,
+    PrimaryKeyColumnConstraint,
+    Schema,
+)
 from dotenv import load_dotenv
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from pydantic import BaseModel, Field
-from psycopg import Connection, connect
-from openai import OpenAI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from pydantic import BaseModel, ConfigDict, Field
+from psycopg import AsyncConnection, errors, sql
+from psycopg.types.json import Jsonb, set_json_dumps
+from psycopg_pool import AsyncConnectionPool, ConnectionPool, PoolTimeout
+from openai import AsyncOpenAI, Timeout
+import orjson
 
 # Load .env from the directory containing this file (so it works regardless of cwd)
 load_dotenv(Path(__file__).resolve().parent / ".env")
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the connection pools and run schema migrations on startup; close the pools and AI client on shutdown."""
+    if POOL is not None:
+        POOL.open()
+        BG_POOL.open()
+        await ASYNC_POOL.open()
+        start_audit_writer()
+        # In the background: an unreachable database must not hold up startup; suggest-keys uses
+        # exact COUNT(DISTINCT) until the check resolves
+        threading.Thread(target=detect_hll, name="detect-hll", daemon=True).start()
+        start_run_listener()
+    ensure_deletion_schedule_table()
+    yield
+    if POOL is not None:
+        await stop_run_listener()
+        # Runs already executing finish; queued ones are cancelled and marked as errors. All of this
+        # happens before the pools close, and before the audit writer stops so the rows the finishing
+        # runs queue are still flushed. The waits block, so they run off the event loop.
+        await asyncio.to_thread(_JOB_EXECUTOR.shutdown, wait=True, cancel_futures=True)
+        await asyncio.to_thread(_QUERY_EXECUTOR.shutdown, wait=True, cancel_futures=True)
+        await asyncio.to_thread(_fail_cancelled_runs)
+        await asyncio.to_thread(stop_audit_writer)
+        BG_POOL.close()
+        await ASYNC_POOL.close()
+        POOL.close()
+    if _OPENAI is not None:
+        await _OPENAI.close()
+
+
 app = FastAPI(
     title="DataTools Portfolio API",
     description="Internal DataTools platform: DDL parse/apply, compare, validate.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 app.add_middleware(
     CORSMiddleware,
@@ -51,103 +105,127 @@ def catch_all_exception_handler(request, exc: Exception):
     return JSONResponse(status_code=500, content={"detail": detail})
 
 
-@app.on_event("startup")
+def _add_columns_sql(table: str, columns: list[tuple[str, str]]) -> str:
+    """One ALTER TABLE adding every missing column; skipped when the table itself does not exist yet."""
+    adds = ",\n    ".join(f"ADD COLUMN IF NOT EXISTS {col} {typ}" for col, typ in columns)
+    return f"ALTER TABLE IF EXISTS {table}\n    {adds}"
+
+
+def _create_index_sql(table: str, name: str, columns: str) -> str:
+    """CREATE INDEX IF NOT EXISTS, skipped (instead of failing the migration) when the table does not exist yet."""
+    return (
+        f"DO $$ BEGIN IF to_regclass('{table}') IS NOT NULL THEN "
+        f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns}); "
+        f"END IF; END $$"
+    )
+
+
+# Startup migrations, sent as one multi-statement query (one round-trip, one implicit transaction);
+# if that fails, each statement is retried on its own so one failure doesn't skip the rest.
+MIGRATION_STATEMENTS = [
+    "CREATE SCHEMA IF NOT EXISTS datatools",
+    # Migrate compare_runs: add env_schema, compare_columns, status, error_message, left_env_schema, right_env_schema if missing
+    _add_columns_sql("datatools.compare_runs", [
+        ("env_schema", "TEXT NOT NULL DEFAULT 'dev'"),
+        ("left_env_schema", "TEXT"),
+        ("right_env_schema", "TEXT"),
+        ("left_pt", "TEXT"),
+        ("right_pt", "TEXT"),
+        ("compare_columns", "TEXT[]"),
+        ("status", "TEXT NOT NULL DEFAULT 'completed'"),
+        ("error_message", "TEXT"),
+    ]),
+    _add_columns_sql("datatools.table_registry", [
+        ("created_at", "TIMESTAMPTZ DEFAULT NOW()"),
+    ]),
+    _add_columns_sql("datatools.validation_runs", [
+        ("env_schema", "TEXT NOT NULL DEFAULT 'dev'"),
+        ("status", "TEXT NOT NULL DEFAULT 'completed'"),
+        ("error_message", "TEXT"),
+    ]),
+    # Run-list indexes: newest-first per env (compare runs match on either side's env)
+    _create_index_sql("datatools.compare_runs", "compare_runs_created_idx", "created_at DESC"),
+    _create_index_sql(
+        "datatools.compare_runs", "compare_runs_left_env_created_idx",
+        "(COALESCE(left_env_schema, env_schema)), created_at DESC",
+    ),
+    _create_index_sql(
+        "datatools.compare_runs", "compare_runs_right_env_created_idx",
+        "(COALESCE(right_env_schema, env_schema)), created_at DESC",
+    ),
+    _create_index_sql("datatools.validation_runs", "validation_runs_env_created_idx", "env_schema, created_at DESC"),
+    _create_index_sql("datatools.validation_runs", "validation_runs_created_idx", "created_at DESC"),
+    """
+    CREATE TABLE IF NOT EXISTS datatools.deletion_schedule (
+        id BIGSERIAL PRIMARY KEY,
+        env_schema TEXT NOT NULL,
+        original_table_name TEXT NOT NULL,
+        renamed_table_name TEXT NOT NULL,
+        delete_after TIMESTAMPTZ NOT NULL,
+        created_at TIMESTAMPTZ DEFAULT NOW()
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS datatools.table_requests (
+        id BIGSERIAL PRIMARY KEY,
+        table_name TEXT NOT NULL,
+        sql_statement TEXT NOT NULL,
+        environment TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending_approval',
+        submitted_by TEXT NOT NULL,
+        submitted_at TIMESTAMPTZ DEFAULT NOW(),
+        approved_by TEXT,
+        approved_at TIMESTAMPTZ,
+        rejection_reason TEXT
+    )
+    """,
+    _add_columns_sql("datatools.table_requests", [
+        ("approved_by_team_lead", "TEXT"),
+        ("approved_at_team_lead", "TIMESTAMPTZ"),
+        ("action", "TEXT NOT NULL DEFAULT 'create'"),
+    ]),
+    """
+    CREATE TABLE IF NOT EXISTS datatools.created_tables (
+        id BIGSERIAL PRIMARY KEY,
+        table_name TEXT NOT NULL,
+        sql_statement TEXT NOT NULL,
+        environment TEXT NOT NULL,
+        created_at TIMESTAMPTZ DEFAULT NOW(),
+        creation_source TEXT NOT NULL
+    )
+    """,
+]
+MIGRATION_SQL = ";\n".join(MIGRATION_STATEMENTS)
+
+
 def ensure_deletion_schedule_table():
     """Create datatools schema and deletion_schedule table if they do not exist."""
-    url = os.getenv("DATABASE_URL")
-    if not url:
+    if POOL is None:
         return
     try:
-        with connect(url) as conn:
+        with POOL.connection() as conn:
             conn.autocommit = True
-            with conn.cursor() as cur:
-                cur.execute("CREATE SCHEMA IF NOT EXISTS datatools")
-                # Migrate compare_runs: add env_schema, compare_columns, status, error_message, left_env_schema, right_env_schema if missing
-                for col, typ in [
-                    ("env_schema", "TEXT NOT NULL DEFAULT 'dev'"),
-                    ("left_env_schema", "TEXT"),
-                    ("right_env_schema", "TEXT"),
-                    ("left_pt", "TEXT"),
-                    ("right_pt", "TEXT"),
-                    ("compare_columns", "TEXT[]"),
-                    ("status", "TEXT NOT NULL DEFAULT 'completed'"),
-                    ("error_message", "TEXT"),
-                ]:
-                    try:
-                        cur.execute(f"ALTER TABLE datatools.compare_runs ADD COLUMN IF NOT EXISTS {col} {typ}")
-                    except Exception:
-                        pass
+            try:
+                conn.execute(MIGRATION_SQL)
+                return
+            except Exception:
+                logger.exception("Startup migration batch failed; retrying statement by statement")
+            for statement in MIGRATION_STATEMENTS:
                 try:
-                    cur.execute(
-                        "ALTER TABLE datatools.table_registry ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ DEFAULT NOW()"
-                    )
+                    conn.execute(statement)
                 except Exception:
-                    pass
-                for col, typ in [
-                    ("env_schema", "TEXT NOT NULL DEFAULT 'dev'"),
-                    ("status", "TEXT NOT NULL DEFAULT 'completed'"),
-                    ("error_message", "TEXT"),
-                ]:
-                    try:
-                        cur.execute(f"ALTER TABLE datatools.validation_runs ADD COLUMN IF NOT EXISTS {col} {typ}")
-                    except Exception:
-                        pass
-                cur.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS datatools.deletion_schedule (
-                        id BIGSERIAL PRIMARY KEY,
-                        env_schema TEXT NOT NULL,
-                        original_table_name TEXT NOT NULL,
-                        renamed_table_name TEXT NOT NULL,
-                        delete_after TIMESTAMPTZ NOT NULL,
-                        created_at TIMESTAMPTZ DEFAULT NOW()
-                    )
-                    """
-                )
-                cur.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS datatools.table_requests (
-                        id BIGSERIAL PRIMARY KEY,
-                        table_name TEXT NOT NULL,
-                        sql_statement TEXT NOT NULL,
-                        environment TEXT NOT NULL,
-                        status TEXT NOT NULL DEFAULT 'pending_approval',
-                        submitted_by TEXT NOT NULL,
-                        submitted_at TIMESTAMPTZ DEFAULT NOW(),
-                        approved_by TEXT,
-                        approved_at TIMESTAMPTZ,
-                        rejection_reason TEXT
-                    )
-                    """
-                )
-                for col, typ in [
-                    ("approved_by_team_lead", "TEXT"),
-                    ("approved_at_team_lead", "TIMESTAMPTZ"),
-                    ("action", "TEXT NOT NULL DEFAULT 'create'"),
-                ]:
-                    try:
-                        cur.execute(f"ALTER TABLE datatools.table_requests ADD COLUMN IF NOT EXISTS {col} {typ}")
-                    except Exception:
-                        pass
-                cur.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS datatools.created_tables (
-                        id BIGSERIAL PRIMARY KEY,
-                        table_name TEXT NOT NULL,
-                        sql_statement TEXT NOT NULL,
-                        environment TEXT NOT NULL,
-                        created_at TIMESTAMPTZ DEFAULT NOW(),
-                        creation_source TEXT NOT NULL
-                    )
-                    """
-                )
+                    logger.exception("Startup migration statement failed: %s", statement.splitlines()[0])
     except Exception:
-        pass
+        logger.exception("Startup migrations skipped: no database connection")
 
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 ALLOWED_SCHEMAS_STR = os.getenv("ALLOWED_SCHEMAS", "dev,prod")
-ALLOWED_SCHEMAS = [s.strip() for s in ALLOWED_SCHEMAS_STR.split(",") if s.strip()]
+ALLOWED_SCHEMAS: frozenset[str] = frozenset(s.strip() for s in ALLOWED_SCHEMAS_STR.split(",") if s.strip())
+_ALLOWED_SCHEMAS_MSG = ", ".join(sorted(ALLOWED_SCHEMAS))
+QUERY_MAX_ROWS = 500  # /query/run SELECT result cap
+DETAILS_SAMPLE_ROWS = 10  # /assets/table-details sample size
+DETAILS_SAMPLE_MAX_COLUMNS = 20  # leading columns read for the sample; wide tables are previewed, not dumped
 ENVS_DIRECT_CREATE = frozenset({"DEV"})  # no approval; create immediately
 ENVS_REQUIRE_APPROVAL = frozenset({"PROD"})
 
@@ -156,12 +234,37 @@ DDL_FORBIDDEN = re.compile(
     r"\b(DROP|ALTER|TRUNCATE|COPY|GRANT|REVOKE)\b",
     re.IGNORECASE,
 )
+# Backup tables are back_up_<original name>_<YYYYMMDD>
+BACKUP_NAME_RE = re.compile(r"^back_up_(.+)_(\d{8})$")
+# Opening tag of a dollar-quoted string ($$ or $tag$), skipped by the /query/run scanner
+_SQL_DOLLAR_TAG_RE = re.compile(r"\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$")
+# Column default already carrying its keyword (sqlglot may render "DEFAULT now()")
+_DEFAULT_PREFIX_RE = re.compile(r"^\s*DEFAULT\b", re.IGNORECASE)
 # Data governance: table name must be {layer}_josephco_{domain}_{tablename}_{granularity}
 # layer=ods|dws|dim|ads|dwd, domain=trade|growth, granularity=di|df|hi|hf (underscores between each part)
 TABLE_NAME_GOVERNANCE = re.compile(
     r"^(ods|dws|dim|ads|dwd)_josephco_(trade|growth)_[a-zA-Z0-9_]+_(di|df|hi|hf)$",
     re.IGNORECASE,
 )
+# Structured-output schema for /ddl/suggest-table-name; the pattern mirrors TABLE_NAME_GOVERNANCE (lowercase).
+TABLE_NAME_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "table_name_suggestion",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "table_name": {
+                    "type": "string",
+                    "pattern": r"^(ods|dws|dim|ads|dwd)_josephco_(trade|growth)_[a-z0-9_]+_(di|df|hi|hf)$",
+                },
+            },
+            "required": ["table_name"],
+            "additionalProperties": False,
+        },
+    },
+}
 
 
 # ---------- Validation ----------
@@ -176,7 +279,7 @@ def validate_env_schema(env_schema: str) -> None:
     if env_schema not in ALLOWED_SCHEMAS:
         raise HTTPException(
             status_code=400,
-            detail=f"env_schema must be one of {ALLOWED_SCHEMAS}, got: {env_schema}",
+            detail=f"env_schema must be one of {_ALLOWED_SCHEMAS_MSG}, got: {env_schema}",
         )
 
 
@@ -201,14 +304,70 @@ def validate_table_name_governance(table_name: str) -> None:
         )
 
 
+def parse_allowed_ddl(ddl: str) -> dict[str, Any]:
+    """Reject forbidden keywords before paying for a sqlglot parse, then parse; both fail as 400."""
+    if DDL_FORBIDDEN.search(ddl):
+        raise HTTPException(
+            status_code=400,
+            detail="DDL must not contain DROP, ALTER, TRUNCATE, COPY, GRANT, REVOKE",
+        )
+    try:
+        return parse_create_table(ddl)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # ---------- Database ----------
 
+# One pool per process: endpoints borrow warm connections instead of paying TCP+TLS+auth per request.
+# Compare/validate jobs run long analytical scans, so they get their own small pool and cannot
+# starve the API path. Both are opened/closed by the app lifespan.
+
+# Pool sizes: Supabase/pgbouncer plans cap connections, so they are tunable per deployment
+_API_POOL_MIN = int(os.getenv("PG_POOL_MIN", "5"))
+_API_POOL_MAX = int(os.getenv("PG_POOL_MAX", "20"))
+_JOB_WORKERS = int(os.getenv("PG_JOB_POOL_MAX", "4"))
+_ASYNC_POOL_MAX = int(os.getenv("PG_ASYNC_POOL_MAX", "5"))
+_POOL_KWARGS: dict[str, Any] = {
+    # Server-side PREPARE for statements executed this many times on a connection
+    "kwargs": {"prepare_threshold": 5},
+    "check": ConnectionPool.check_connection,
+    "max_lifetime": 1800.0,
+    "open": False,
+}
+POOL: Optional[ConnectionPool] = (
+    ConnectionPool(
+        DATABASE_URL, min_size=_API_POOL_MIN, max_size=_API_POOL_MAX, num_workers=3, timeout=30.0, name="api",
+        **_POOL_KWARGS,
+    )
+    if DATABASE_URL
+    else None
+)
+BG_POOL: Optional[ConnectionPool] = (
+    ConnectionPool(DATABASE_URL, min_size=1, max_size=_JOB_WORKERS, timeout=120.0, name="jobs", **_POOL_KWARGS)
+    if DATABASE_URL
+    else None
+)
+# Small async pool for the run-status polls: the frontend hits them every few seconds per open run,
+# and as async endpoints they wait on Postgres on the event loop instead of holding a worker thread.
+ASYNC_POOL: Optional[AsyncConnectionPool] = (
+    AsyncConnectionPool(
+        DATABASE_URL, min_size=1, max_size=_ASYNC_POOL_MAX, timeout=30.0, name="api-async",
+        **{**_POOL_KWARGS, "check": AsyncConnectionPool.check_connection},
+    )
+    if DATABASE_URL
+    else None
+)
+
 
 @contextmanager
-def get_conn():
-    if not DATABASE_URL:
+def get_conn(pool: Optional[ConnectionPool] = None):
+    """Borrow a connection (from POOL unless another pool is given); commit on success, roll back on error."""
+    pool = pool or POOL
+    if pool is None:
         raise HTTPException(status_code=500, detail="DATABASE_URL not set")
-    with connect(DATABASE_URL) as conn:
+    with pool.connection() as conn:
+        # Pooled connections may come back with autocommit set by a previous borrower
         conn.autocommit = False
         try:
             yield conn
@@ -218,16 +377,229 @@ def get_conn():
             raise
 
 
-def audit_log(conn: Connection, action: str, env_schema: Optional[str], details: dict[str, Any]) -> None:
-    """Write one row to datatools.audit_log."""
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO datatools.audit_log (action, env_schema, details)
-            VALUES (%s, %s, %s::jsonb)
-            """,
-            (action, env_schema, json.dumps(details)),
-        )
+@asynccontextmanager
+async def get_async_conn():
+    """Async counterpart of get_conn, borrowing from ASYNC_POOL."""
+    if ASYNC_POOL is None:
+        raise HTTPException(status_code=500, detail="DATABASE_URL not set")
+    async with ASYNC_POOL.connection() as conn:
+        await conn.set_autocommit(False)
+        try:
+            yield conn
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+
+
+# Fan-out for independent read queries. Each task borrows its own pooled connection,
+# since one psycopg connection cannot run statements concurrently.
+_QUERY_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="datatools-query")
+
+# Compare/validate jobs run on their own bounded pool, one worker per BG_POOL connection: extra runs
+# wait in the executor queue (status stays 'pending') instead of tying up the request threadpool.
+_JOB_EXECUTOR = ThreadPoolExecutor(max_workers=_JOB_WORKERS, thread_name_prefix="datatools-job")
+# Queued run futures -> (kind, run_id), so runs cancelled at shutdown can be marked as failed
+_QUEUED_RUNS: dict[Future, tuple[str, int]] = {}
+_QUEUED_RUNS_LOCK = threading.Lock()
+
+
+def _submit_run(kind: str, run_id: int, fn: Callable[..., None], *args: Any) -> None:
+    """Queue a compare/validate job on _JOB_EXECUTOR; fn is called as fn(run_id, *args)."""
+    future = _JOB_EXECUTOR.submit(fn, run_id, *args)
+    with _QUEUED_RUNS_LOCK:
+        _QUEUED_RUNS[future] = (kind, run_id)
+    future.add_done_callback(_forget_run)
+
+
+def _forget_run(future: Future) -> None:
+    # Cancelled runs stay listed for _fail_cancelled_runs
+    if not future.cancelled():
+        with _QUEUED_RUNS_LOCK:
+            _QUEUED_RUNS.pop(future, None)
+
+
+def _fetchone_pooled(query: sql.Composable, params: Optional[tuple] = None) -> Optional[tuple]:
+    """Run one read query on its own pooled connection and return the first row."""
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(query, params)
+            return cur.fetchone()
+
+
+# Bind JSON values as Jsonb(...): psycopg serializes them with orjson (several times faster than json)
+# at execute time and sends them typed as jsonb, so no text-to-jsonb cast is needed in SQL.
+set_json_dumps(orjson.dumps)
+
+
+def _fetchval_spare_job_conn(query: sql.Composable, params: Optional[tuple] = None) -> Optional[Any]:
+    """
+    Run one single-value read query on a spare BG_POOL connection and return that value.
+    Returns None when none frees up within a couple of seconds, so a job fanning out while holding
+    its own connection falls back to that connection instead of waiting on other jobs.
+    """
+    try:
+        with BG_POOL.connection(timeout=2.0) as conn:
+            return conn.execute(query, params, prepare=True).fetchone()[0]
+    except PoolTimeout:
+        return None
+
+
+# Audit rows are queued and written in batches by a background thread, off the request path.
+_AUDIT_Q: "queue.Queue[Optional[tuple[str, Optional[str], Jsonb, datetime]]]" = queue.Queue(maxsize=10_000)
+_AUDIT_BATCH_MAX = 500
+_AUDIT_FLUSH_SECS = 1.0
+_AUDIT_THREAD: Optional[threading.Thread] = None
+
+
+def audit_log(action: str, env_schema: Optional[str], details: dict[str, Any]) -> None:
+    """Queue one row for datatools.audit_log (written synchronously if the queue is full), stamped at call time."""
+    row = (action, env_schema, Jsonb(details), datetime.now(timezone.utc))
+    try:
+        _AUDIT_Q.put_nowait(row)
+    except queue.Full:
+        _write_audit_rows([row])
+
+
+def _write_audit_rows(rows: list[tuple[str, Optional[str], Jsonb, datetime]]) -> None:
+    with get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.executemany(
+                """
+                INSERT INTO datatools.audit_log (action, env_schema, details, created_at)
+                VALUES (%s, %s, %s, %s)
+                """,
+                rows,
+            )
+
+
+def _audit_writer() -> None:
+    """Drain _AUDIT_Q in batches of up to _AUDIT_BATCH_MAX rows or _AUDIT_FLUSH_SECS; stop on a None sentinel."""
+    while True:
+        rows = []
+        item = _AUDIT_Q.get()
+        deadline = time.monotonic() + _AUDIT_FLUSH_SECS
+        while item is not None:
+            rows.append(item)
+            remaining = deadline - time.monotonic()
+            if len(rows) >= _AUDIT_BATCH_MAX or remaining <= 0:
+                break
+            try:
+                item = _AUDIT_Q.get(timeout=remaining)
+            except queue.Empty:
+                break
+        if rows:
+            try:
+                _write_audit_rows(rows)
+            except Exception:
+                pass
+        if item is None:
+            return
+
+
+def start_audit_writer() -> None:
+    global _AUDIT_THREAD
+    if _AUDIT_THREAD is None or not _AUDIT_THREAD.is_alive():
+        _AUDIT_THREAD = threading.Thread(target=_audit_writer, name="audit-writer", daemon=True)
+        _AUDIT_THREAD.start()
+
+
+def stop_audit_writer() -> None:
+    """Flush queued audit rows and stop the writer (app shutdown / interpreter exit)."""
+    if _AUDIT_THREAD is not None and _AUDIT_THREAD.is_alive():
+        _AUDIT_Q.put(None)
+        _AUDIT_THREAD.join(timeout=10)
+
+
+atexit.register(stop_audit_writer)
+
+
+# ---------- Metadata cache ----------
+
+# Catalog lookups (information_schema, table_registry DDL) change rarely; reuse them for a short TTL.
+# Keys are tuples whose items after the first are (env_schema, table_name) pairs, so
+# _invalidate_table_meta can drop every entry that mentions a table we create or rename.
+_META_CACHE_TTL = 60.0
+_META_CACHE_MAX = 1024
+_META_CACHE: dict[tuple, tuple[float, Any]] = {}
+_META_CACHE_LOCK = threading.Lock()
+
+
+def _cached_meta(key: tuple, fetch: Callable[[], Any], ttl: float = _META_CACHE_TTL) -> Any:
+    """Return fetch() for key, reusing a value younger than ttl seconds. Empty results are not cached."""
+    now = time.monotonic()
+    hit = _META_CACHE.get(key)
+    if hit and now - hit[0] < ttl:
+        return hit[1]
+    value = fetch()
+    if value:
+        with _META_CACHE_LOCK:
+            _META_CACHE[key] = (now, value)
+            while len(_META_CACHE) > _META_CACHE_MAX:
+                _META_CACHE.pop(next(iter(_META_CACHE)))
+    return value
+
+
+def _invalidate_table_meta(env_schema: str, *table_names: str) -> None:
+    """Drop cached metadata for tables that were just created, renamed or dropped."""
+    targets = {(env_schema, t) for t in table_names}
+    with _META_CACHE_LOCK:
+        for key in [k for k in _META_CACHE if targets.intersection(k[1:])]:
+            del _META_CACHE[key]
+
+
+def get_table_columns(conn, env_schema: str, table_name: str) -> tuple:
+    """(column_name, data_type, is_nullable, column_default) rows in ordinal order, cached per table."""
+    def fetch() -> tuple:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT column_name, data_type, is_nullable, column_default
+                FROM information_schema.columns
+                WHERE table_schema = %s AND table_name = %s
+                ORDER BY ordinal_position
+                """,
+                (env_schema, table_name),
+            )
+            return tuple(cur.fetchall())
+
+    return _cached_meta(("columns", (env_schema, table_name)), fetch)
+
+
+def get_registry_ddl(conn, env_schema: str, table_name: str) -> Optional[str]:
+    """DDL recorded in datatools.table_registry for the table, cached like its columns (every registry write invalidates it)."""
+    def fetch() -> Optional[str]:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT ddl FROM datatools.table_registry WHERE env_schema = %s AND table_name = %s",
+                (env_schema, table_name),
+            )
+            row = cur.fetchone()
+            return row[0] if row else None
+
+    return _cached_meta(("registry_ddl", (env_schema, table_name)), fetch)
+
+
+# ---------- OpenAI ----------
+
+# One client per process so AI endpoints share its HTTP connection pool instead of
+# paying a TLS handshake per request. Created lazily: the key is read from .env on first use.
+_OPENAI: Optional[AsyncOpenAI] = None
+_OPENAI_LOCK = threading.Lock()
+
+
+def get_openai(api_key: str) -> AsyncOpenAI:
+    """Return the shared AsyncOpenAI client, creating it on first use."""
+    global _OPENAI
+    if _OPENAI is None:
+        with _OPENAI_LOCK:
+            if _OPENAI is None:
+                _OPENAI = AsyncOpenAI(
+                    api_key=api_key,
+                    timeout=Timeout(30.0, connect=5.0),
+                    max_retries=2,
+                )
+    return _OPENAI
 
 
 # ---------- DDL parsing (sqlglot) ----------
@@ -241,7 +613,24 @@ def parse_create_table(ddl: str) -> dict[str, Any]:
     ddl_stripped = (ddl or "").strip()
     if not ddl_stripped:
         raise ValueError("DDL is empty")
+    schema_in_ddl, table_name, columns, constraints = _parse_create_table_cached(ddl_stripped)
+    return {
+        "schema_in_ddl": schema_in_ddl,
+        "table": table_name,
+        "columns": [
+            {"name": name, "type": dtype, "nullable": nullable, "default": default_val}
+            for (name, dtype, nullable, default_val) in columns
+        ],
+        "constraints": [{"raw": raw} for raw in constraints],
+    }
+
 
+@lru_cache(maxsize=256)
+def _parse_create_table_cached(ddl_stripped: str) -> tuple:
+    """
+    sqlglot parse of a stripped CREATE TABLE, memoized (parse then apply round-trips the same DDL).
+    Returns an immutable (schema_in_ddl, table, columns, constraints) tuple; callers build fresh dicts.
+    """
     parsed = sqlglot.parse(ddl_stripped, dialect="postgres")
     if not parsed or len(parsed) == 0:
         raise ValueError("Could not parse DDL")
@@ -268,43 +657,30 @@ def parse_create_table(ddl: str) -> dict[str, Any]:
     columns = []
     constraints = []
 
-    # Column definitions: use find_all(ColumnDef) to get every column in the tree
-    for col in stmt.find_all(ColumnDef):
-        col_this = col.this
+    # Single pass over the CREATE body (Schema.expressions): ColumnDefs and table-level constraints
+    # (e.g. PRIMARY KEY (id), UNIQUE (x)). Column constraints are ColumnConstraint wrappers; dispatch on .kind.
+    body = stmt.this.expressions if isinstance(stmt.this, Schema) else []
+    for child in body:
+        if not isinstance(child, ColumnDef):
+            constraints.append(child.sql(dialect="postgres"))
+            continue
+        col_this = child.this
         col_name = col_this.name if hasattr(col_this, "name") else str(col_this)
-        kind = getattr(col, "kind", None)
+        kind = child.args.get("kind")
         dtype = kind.sql(dialect="postgres") if kind else "TEXT"
         nullable = True
         default_val = None
-        for c in col.args.get("constraints") or []:
-            cname = type(c).__name__
-            if "NotNull" in cname or "PrimaryKey" in cname:
+        for c in child.args.get("constraints") or []:
+            ckind = c.args.get("kind")
+            if isinstance(ckind, PrimaryKeyColumnConstraint):
                 nullable = False
-            if "Default" in cname:
-                try:
-                    default_val = c.sql(dialect="postgres")
-                except Exception:
-                    default_val = None
-        columns.append({
-            "name": col_name,
-            "type": dtype,
-            "nullable": nullable,
-            "default": default_val,
-        })
+            elif isinstance(ckind, NotNullColumnConstraint):
+                nullable = bool(ckind.args.get("allow_null"))
+            elif isinstance(ckind, DefaultColumnConstraint) and ckind.this is not None:
+                default_val = ckind.this.sql(dialect="postgres")
+        columns.append((col_name, dtype, nullable, default_val))
 
-    # Table-level constraints (e.g. PRIMARY KEY (id), UNIQUE (x)) - non-ColumnDef expressions in body
-    expr = stmt.expression
-    if expr and hasattr(expr, "expressions"):
-        for child in expr.expressions:
-            if not isinstance(child, ColumnDef):
-                constraints.append({"raw": child.sql(dialect="postgres")})
-
-    return {
-        "schema_in_ddl": schema_in_ddl,
-        "table": table_name,
-        "columns": columns,
-        "constraints": constraints,
-    }
+    return (schema_in_ddl, table_name, tuple(columns), tuple(constraints))
 
 
 def build_create_table_sql(env_schema: str, table_name: str, parsed: dict[str, Any]) -> str:
@@ -321,7 +697,7 @@ def build_create_table_sql(env_schema: str, table_name: str, parsed: dict[str, A
         if not nullable:
             seg += " NOT NULL"
         if default:
-            seg += " " + (default if str(default).upper().strip().startswith("DEFAULT") else f"DEFAULT {default}")
+            seg += " " + (default if _DEFAULT_PREFIX_RE.match(str(default)) else f"DEFAULT {default}")
         col_defs.append(seg)
     for con in parsed.get("constraints") or []:
         col_defs.append(con.get("raw", ""))
@@ -330,20 +706,43 @@ def build_create_table_sql(env_schema: str, table_name: str, parsed: dict[str, A
     return "\n".join(parts)
 
 
+def build_column_comments_sql(
+    env_schema: str, table_name: str, columns: list[dict[str, Any]], comments_by_col: dict[str, Any],
+) -> Optional[sql.Composed]:
+    """COMMENT ON COLUMN ... IS 'EN: ... | ZH: ...' for every commented column, as one script (None if none)."""
+    stmts = []
+    for col in columns:
+        cname = col.get("name", "")
+        cc = comments_by_col.get(cname)
+        if cc and cc.comment_en and cc.comment_zh:
+            combined = f"EN: {cc.comment_en.strip()} | ZH: {cc.comment_zh.strip()}"
+            stmts.append(
+                sql.SQL("COMMENT ON COLUMN {} IS {}").format(
+                    sql.Identifier(env_schema, table_name, cname), sql.Literal(combined),
+                )
+            )
+    return sql.SQL(";\n").join(stmts) if stmts else None
+
+
 # ---------- Request/Response models ----------
 
 
-class DdlParseRequest(BaseModel):
+class _RequestModel(BaseModel):
+    """Base for request bodies: read-only after validation, unknown fields dropped."""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+
+class DdlParseRequest(_RequestModel):
     ddl: str = Field(..., description="CREATE TABLE statement")
 
 
-class ColumnCommentInput(BaseModel):
+class ColumnCommentInput(_RequestModel):
     column_name: str
     comment_en: str = ""
     comment_zh: str = ""
 
 
-class DdlApplyRequest(BaseModel):
+class DdlApplyRequest(_RequestModel):
     ddl: str = Field(..., description="CREATE TABLE statement")
     env_schema: str = Field(..., description="Target schema: dev or prod")
     column_comments: Optional[list[ColumnCommentInput]] = Field(
@@ -352,16 +751,16 @@ class DdlApplyRequest(BaseModel):
     )
 
 
-class SuggestColumnCommentsRequest(BaseModel):
+class SuggestColumnCommentsRequest(_RequestModel):
     columns: list[dict[str, Any]] = Field(..., description="List of {name, type} for each column")
     table_name: Optional[str] = Field(default=None, description="Optional table name for context")
 
 
-class SuggestTableNameRequest(BaseModel):
+class SuggestTableNameRequest(_RequestModel):
     ddl: str = Field(..., description="CREATE TABLE statement to infer table purpose from columns")
 
 
-class CompareSuggestKeysRequest(BaseModel):
+class CompareSuggestKeysRequest(_RequestModel):
     left_table: str
     right_table: str
     left_pt: Optional[str] = Field(None, min_length=8, max_length=12, description="Partition: 20260101 (daily) or 2026010123 (hourly)")
@@ -372,12 +771,12 @@ class CompareSuggestKeysRequest(BaseModel):
     max_candidates: int = Field(default=5, ge=1, le=20)
 
 
-class ColumnPair(BaseModel):
+class ColumnPair(_RequestModel):
     left: str
     right: str
 
 
-class CompareRunRequest(BaseModel):
+class CompareRunRequest(_RequestModel):
     left_table: str
     right_table: str
     left_pt: Optional[str] = Field(None, min_length=8, max_length=12, description="Partition: 20260101 (daily) or 2026010123 (hourly)")
@@ -392,26 +791,34 @@ class CompareRunRequest(BaseModel):
     sample_limit: int = Field(default=50, ge=1, le=1000)
 
 
-class ValidateRunRequest(BaseModel):
+class ValidateRunRequest(_RequestModel):
     target_table: str
     env_schema: str
 
 
-class ScheduleDeleteRequest(BaseModel):
+class ScheduleDeleteRequest(_RequestModel):
     env_schema: str
     table_name: str
 
 
-class RestoreBackupRequest(BaseModel):
+class RestoreBackupRequest(_RequestModel):
     env_schema: str
     table_name: str  # backup table name, e.g. back_up_users_20260224
 
 
-class RunQueryRequest(BaseModel):
+class EnsureCompareIndexRequest(_RequestModel):
+    env_schema: str
+    table_name: str
+    join_keys: list[str] = Field(..., min_length=1)
+    compare_columns: list[str] = Field(default_factory=list)  # carried as INCLUDE columns
+    apply: bool = False  # False: only report whether a matching index exists and the DDL to create one
+
+
+class RunQueryRequest(_RequestModel):
     sql: str = Field(..., min_length=1, description="Single SELECT statement only")
 
 
-class TableRequestCreate(BaseModel):
+class TableRequestCreate(_RequestModel):
     table_name: str = Field(..., min_length=1)
     sql_statement: str = Field("", description="Required for action=create; can be empty for delete/restore")
     environment: str = Field(..., description="DEV or PROD")
@@ -420,12 +827,12 @@ class TableRequestCreate(BaseModel):
     action: str = Field("create", description="create, delete, or restore")
 
 
-class TableRequestApprove(BaseModel):
+class TableRequestApprove(_RequestModel):
     approved_by: str = Field(..., min_length=1)
     step: Optional[str] = Field(None, description="team_lead or governance for two-step approval")
 
 
-class TableRequestReject(BaseModel):
+class TableRequestReject(_RequestModel):
     rejection_reason: Optional[str] = None
 
 
@@ -443,7 +850,7 @@ def ddl_parse(req: DdlParseRequest):
 
 
 @app.post("/ddl/suggest-column-comments")
-def suggest_column_comments(req: SuggestColumnCommentsRequest):
+async def suggest_column_comments(req: SuggestColumnCommentsRequest):
     """Use AI to generate English and Chinese column comments. Requires OPENAI_API_KEY in .env."""
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key or not api_key.strip():
@@ -463,20 +870,17 @@ Table context:{table_context}
 Columns:
 {col_list}
 
-Return a JSON array only, no other text. Each item: {{"column_name": "<name>", "comment_en": "<short English comment>", "comment_zh": "<简短中文注释>"}}
-Example: [{{"column_name": "id", "comment_en": "Primary key identifier.", "comment_zh": "主键标识。"}}]"""
+Return a JSON object only: {{"suggestions": [...]}}. Each item: {{"column_name": "<name>", "comment_en": "<short English comment>", "comment_zh": "<简短中文注释>"}}
+Example: {{"suggestions": [{{"column_name": "id", "comment_en": "Primary key identifier.", "comment_zh": "主键标识。"}}]}}"""
     try:
-        client = OpenAI(api_key=api_key)
-        resp = client.chat.completions.create(
+        resp = await get_openai(api_key).chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
+            response_format={"type": "json_object"},
         )
-        text = (resp.choices[0].message.content or "").strip()
-        # Strip markdown code block if present
-        if text.startswith("```"):
-            text = text.split("\n", 1)[-1].rstrip().removesuffix("```").strip()
-        suggestions = json.loads(text)
+        body = json.loads(resp.choices[0].message.content or "{}")
+        suggestions = body.get("suggestions") if isinstance(body, dict) else None
         if not isinstance(suggestions, list):
             suggestions = []
         # Ensure we have column_name, comment_en, comment_zh for each
@@ -496,7 +900,7 @@ Example: [{{"column_name": "id", "comment_en": "Primary key identifier.", "comme
 
 
 @app.post("/ddl/suggest-table-name")
-def suggest_table_name(req: SuggestTableNameRequest):
+async def suggest_table_name(req: SuggestTableNameRequest):
     """Use AI to suggest a table name following governance: {ods|dws|dim|ads|dwd}_josephco_{trade|growth}_{tablename}_{di|df|hi|hf}. Requires OPENAI_API_KEY in .env."""
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key or not api_key.strip():
@@ -505,7 +909,8 @@ def suggest_table_name(req: SuggestTableNameRequest):
             detail="OPENAI_API_KEY is not set. Add it to .env to use AI-suggested table names.",
         )
     try:
-        parsed = parse_create_table(req.ddl)
+        # sqlglot parsing is CPU-bound: keep it off the event loop that serves the async endpoints
+        parsed = await asyncio.to_thread(parse_create_table, req.ddl)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     current_table = (parsed.get("table") or "").strip()
@@ -527,20 +932,17 @@ Current table name (may be non-compliant): {current_table}
 Columns:
 {col_list}
 
-Return ONLY the suggested table name, nothing else. No quotes, no explanation. Example: ods_josephco_trade_kline_candles_di"""
+Return JSON {{"table_name": "<suggested name>"}}. Example: {{"table_name": "ods_josephco_trade_kline_candles_di"}}"""
     try:
-        client = OpenAI(api_key=api_key)
-        resp = client.chat.completions.create(
+        resp = await get_openai(api_key).chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
+            max_tokens=40,
+            response_format=TABLE_NAME_RESPONSE_FORMAT,
         )
-        suggested = (resp.choices[0].message.content or "").strip().strip('"\'')
-        if suggested:
-            # Extract compliant name if AI added extra text (e.g. "Name: ods_josephco_trade_..._di")
-            match = TABLE_NAME_GOVERNANCE.search(suggested)
-            if match:
-                suggested = match.group(0)
+        body = json.loads(resp.choices[0].message.content or "{}")
+        suggested = str(body.get("table_name") or "").strip() if isinstance(body, dict) else ""
         if not TABLE_NAME_GOVERNANCE.match(suggested):
             raise HTTPException(
                 status_code=502,
@@ -561,15 +963,7 @@ Return ONLY the suggested table name, nothing else. No quotes, no explanation. E
 def ddl_apply(req: DdlApplyRequest):
     """Validate env_schema, parse DDL, force schema, execute CREATE TABLE, upsert table_registry, audit."""
     validate_env_schema(req.env_schema)
-    if DDL_FORBIDDEN.search(req.ddl):
-        raise HTTPException(
-            status_code=400,
-            detail="DDL must not contain DROP, ALTER, TRUNCATE, COPY, GRANT, REVOKE",
-        )
-    try:
-        parsed = parse_create_table(req.ddl)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    parsed = parse_allowed_ddl(req.ddl)
 
     table_name = parsed.get("table") or ""
     if not validate_identifier(table_name):
@@ -598,32 +992,27 @@ def ddl_apply(req: DdlApplyRequest):
             with conn.cursor() as cur:
                 cur.execute(applied_sql)
             # COMMENT ON COLUMN for each column (Postgres allows one comment per column; store "EN: ... | ZH: ...")
-            for col in columns:
-                cname = col.get("name", "")
-                cc = comments_by_col.get(cname)
-                if cc and cc.comment_en and cc.comment_zh:
-                    combined = f"EN: {cc.comment_en.strip()} | ZH: {cc.comment_zh.strip()}"
-                    # Escape single quotes for SQL: ' -> ''
-                    combined_escaped = combined.replace("'", "''")
-                    comment_sql = f'COMMENT ON COLUMN "{req.env_schema}"."{table_name}"."{cname}" IS \'{combined_escaped}\''
-                    with conn.cursor() as c2:
-                        c2.execute(comment_sql)
+            comment_sql = build_column_comments_sql(req.env_schema, table_name, columns, comments_by_col)
+            if comment_sql is not None:
+                with conn.cursor() as cur:
+                    cur.execute(comment_sql)
             # Upsert table_registry(env_schema, table_name, ddl, parsed_json)
             with conn.cursor() as cur:
                 cur.execute(
                     """
                     INSERT INTO datatools.table_registry (env_schema, table_name, ddl, parsed_json)
-                    VALUES (%s, %s, %s, %s::jsonb)
+                    VALUES (%s, %s, %s, %s)
                     ON CONFLICT (env_schema, table_name)
                     DO UPDATE SET ddl = EXCLUDED.ddl, parsed_json = EXCLUDED.parsed_json
                     """,
-                    (req.env_schema, table_name, req.ddl, json.dumps(parsed)),
+                    (req.env_schema, table_name, req.ddl, Jsonb(parsed)),
                 )
-            audit_log(conn, "ddl_apply", req.env_schema, {
+            audit_log("ddl_apply", req.env_schema, {
                 "env_schema": req.env_schema,
                 "table": table_name,
                 "applied_sql": applied_sql,
             })
+        _invalidate_table_meta(req.env_schema, table_name)
     except HTTPException:
         raise
     except Exception as e:
@@ -642,6 +1031,38 @@ def _pt_where(pt: Optional[str]) -> str:
     return ' AND "pt" = %s'
 
 
+# Set (by a startup thread) when the postgresql-hll extension is installed; suggest-keys then estimates
+# distinct counts with HyperLogLog instead of an exact COUNT(DISTINCT) sort/hash per column.
+_HAS_HLL = False
+
+
+def detect_hll() -> None:
+    """Record whether the hll extension is available on the configured database."""
+    global _HAS_HLL
+    try:
+        row = _fetchone_pooled(sql.SQL("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'hll')"))
+        _HAS_HLL = bool(row and row[0])
+    except Exception:
+        _HAS_HLL = False
+
+
+def _column_stats_sql(env_schema: str, table_name: str, col_names: list[str], use_pt: bool) -> sql.Composed:
+    """Single-scan stats: COUNT(*), then distinct count and null count per column."""
+    distinct_tpl = (
+        sql.SQL("COALESCE(ROUND(hll_cardinality(hll_add_agg(hll_hash_any({}))))::bigint, 0)")
+        if _HAS_HLL
+        else sql.SQL("COUNT(DISTINCT {})")
+    )
+    aggs = [sql.SQL("COUNT(*)")]
+    for c in col_names:
+        aggs.append(distinct_tpl.format(sql.Identifier(c)))
+        aggs.append(sql.SQL("COUNT(*) FILTER (WHERE {} IS NULL)").format(sql.Identifier(c)))
+    where = sql.SQL(' WHERE "pt" = %s') if use_pt else sql.SQL("")
+    return sql.SQL("SELECT {} FROM {}{}").format(
+        sql.SQL(", ").join(aggs), sql.Identifier(env_schema, table_name), where,
+    )
+
+
 @app.post("/compare/suggest-keys")
 def compare_suggest_keys(req: CompareSuggestKeysRequest):
     """Find common columns by name+type, score by uniqueness and null ratio, return top N."""
@@ -653,98 +1074,148 @@ def compare_suggest_keys(req: CompareSuggestKeysRequest):
     validate_table_name(req.right_table)
 
     with get_conn() as conn:
-        with conn.cursor() as cur:
-            # Common columns: same name in both tables (match by name only; dev/prod may have
-            # slightly different data_type e.g. text vs character varying - both are comparable)
-            cur.execute(
-                """
-                SELECT a.column_name, a.data_type
-                FROM information_schema.columns a
-                JOIN information_schema.columns b
-                  ON a.column_name = b.column_name
-                WHERE a.table_schema = %s AND a.table_name = %s
-                  AND b.table_schema = %s AND b.table_name = %s
-                ORDER BY a.ordinal_position
-                """,
-                (left_env, req.left_table, right_env, req.right_table),
-            )
-            common = cur.fetchall()
+        def fetch_common() -> tuple:
+            with conn.cursor() as cur:
+                # Common columns: same name in both tables (match by name only; dev/prod may have
+                # slightly different data_type e.g. text vs character varying - both are comparable)
+                cur.execute(
+                    """
+                    SELECT a.column_name, a.data_type
+                    FROM information_schema.columns a
+                    JOIN information_schema.columns b
+                      ON a.column_name = b.column_name
+                    WHERE a.table_schema = %s AND a.table_name = %s
+                      AND b.table_schema = %s AND b.table_name = %s
+                    ORDER BY a.ordinal_position
+                    """,
+                    (left_env, req.left_table, right_env, req.right_table),
+                )
+                return tuple(cur.fetchall())
+
+        common = _cached_meta(
+            ("common_columns", (left_env, req.left_table), (right_env, req.right_table)),
+            fetch_common,
+        )
 
         if not common:
-            audit_log(conn, "compare_suggest_keys", left_env, {
+            audit_log("compare_suggest_keys", left_env, {
                 "left_table": req.left_table,
                 "right_table": req.right_table,
                 "candidates": [],
             })
             return {"candidates": []}
 
-        left_pt_where = _pt_where(req.left_pt)
-        right_pt_where = _pt_where(req.right_pt)
-
-        candidates = []
-        for (col_name, data_type) in common:
-            if not validate_identifier(col_name):
-                continue
-            with conn.cursor() as cur:
-                if left_pt_where and right_pt_where:
-                    cur.execute(
-                        f"""
-                        SELECT
-                          ({left_base} WHERE 1=1{left_pt_where}) AS left_rows,
-                          ({right_base} WHERE 1=1{right_pt_where}) AS right_rows,
-                          (SELECT COUNT(DISTINCT "{col_name}") FROM "{left_env}"."{req.left_table}" WHERE 1=1{left_pt_where}) AS left_distinct,
-                          (SELECT COUNT(*) - COUNT("{col_name}") FROM "{left_env}"."{req.left_table}" WHERE 1=1{left_pt_where}) AS left_nulls,
-                          (SELECT COUNT(DISTINCT "{col_name}") FROM "{right_env}"."{req.right_table}" WHERE 1=1{right_pt_where}) AS right_distinct,
-                          (SELECT COUNT(*) - COUNT("{col_name}") FROM "{right_env}"."{req.right_table}" WHERE 1=1{right_pt_where}) AS right_nulls
-                        """,
-                        (req.left_pt, req.right_pt, req.left_pt, req.left_pt, req.right_pt, req.right_pt),
-                    )
-                else:
-                    cur.execute(
-                        f"""
-                        SELECT
-                          (SELECT COUNT(*) FROM "{left_env}"."{req.left_table}") AS left_rows,
-                          (SELECT COUNT(*) FROM "{right_env}"."{req.right_table}") AS right_rows,
-                          (SELECT COUNT(DISTINCT "{col_name}") FROM "{left_env}"."{req.left_table}") AS left_distinct,
-                          (SELECT COUNT(*) - COUNT("{col_name}") FROM "{left_env}"."{req.left_table}") AS left_nulls,
-                          (SELECT COUNT(DISTINCT "{col_name}") FROM "{right_env}"."{req.right_table}") AS right_distinct,
-                          (SELECT COUNT(*) - COUNT("{col_name}") FROM "{right_env}"."{req.right_table}") AS right_nulls
-                        """,
-                    )
-                row = cur.fetchone()
-            if not row or row[0] == 0 or row[1] == 0:
-                uniq_score = 0.0
-                null_penalty = 0.0
-            else:
-                left_rows, right_rows = int(row[0]), int(row[1])
-                left_distinct, left_nulls = int(row[2]), int(row[3])
-                right_distinct, right_nulls = int(row[4]), int(row[5])
-                uniq_score = min(left_distinct / left_rows, right_distinct / right_rows)
-                null_penalty = (left_nulls / left_rows) + (right_nulls / right_rows)
-                uniq_score = min(uniq_score, 1.0)
-            score = max(0.0, uniq_score - null_penalty)
-            candidates.append({
-                "column": col_name,
-                "data_type": data_type,
-                "score": round(score, 4),
-            })
+    # Partition filters apply only when both sides have a pt
+    use_pt = bool(_pt_where(req.left_pt) and _pt_where(req.right_pt))
+    col_names = [col_name for (col_name, _) in common]
+    # One scan per side computes row count plus distinct/null counts for every column;
+    # the two sides are independent, so run them concurrently on separate pooled connections
+    left_future = _QUERY_EXECUTOR.submit(
+        _fetchone_pooled,
+        _column_stats_sql(left_env, req.left_table, col_names, use_pt),
+        (req.left_pt,) if use_pt else None,
+    )
+    right_future = _QUERY_EXECUTOR.submit(
+        _fetchone_pooled,
+        _column_stats_sql(right_env, req.right_table, col_names, use_pt),
+        (req.right_pt,) if use_pt else None,
+    )
+    left_stats, right_stats = left_future.result(), right_future.result()
+    left_rows, right_rows = int(left_stats[0]), int(right_stats[0])
+
+    candidates = []
+    for i, (col_name, data_type) in enumerate(common):
+        if left_rows == 0 or right_rows == 0:
+            uniq_score = 0.0
+            null_penalty = 0.0
+        else:
+            left_distinct, left_nulls = int(left_stats[1 + 2 * i]), int(left_stats[2 + 2 * i])
+            right_distinct, right_nulls = int(right_stats[1 + 2 * i]), int(right_stats[2 + 2 * i])
+            uniq_score = min(left_distinct / left_rows, right_distinct / right_rows)
+            null_penalty = (left_nulls / left_rows) + (right_nulls / right_rows)
+            uniq_score = min(uniq_score, 1.0)
+        score = max(0.0, uniq_score - null_penalty)
+        candidates.append({
+            "column": col_name,
+            "data_type": data_type,
+            "score": round(score, 4),
+        })
 
-        candidates.sort(key=lambda x: -x["score"])
-        top = candidates[: req.max_candidates]
+    candidates.sort(key=lambda x: -x["score"])
+    top = candidates[: req.max_candidates]
 
-        audit_log(conn, "compare_suggest_keys", left_env, {
-            "left_table": req.left_table,
-            "right_table": req.right_table,
-            "candidates": top,
-        })
+    audit_log("compare_suggest_keys", left_env, {
+        "left_table": req.left_table,
+        "right_table": req.right_table,
+        "candidates": top,
+    })
 
     return {"candidates": top}
 
 
+def _join_on_sql(pairs: list[tuple[str, str]]) -> sql.Composed:
+    """l."a" = r."b" AND ... for validated (left, right) key pairs."""
+    return sql.SQL(" AND ").join(
+        sql.SQL("l.{} = r.{}").format(sql.Identifier(lk), sql.Identifier(rk)) for lk, rk in pairs
+    )
+
+
+def _compare_counts_sql(
+    left_tbl: sql.Identifier, right_tbl: sql.Identifier, pairs: list[tuple[str, str]], pt_where: sql.Composable,
+) -> sql.Composed:
+    """
+    One row: left/right counts, missing_in_right, missing_in_left, matched, and the unmatched-row sample
+    as jsonb text. Params: the two pt values when pt_where filters, then the sample limit.
+
+    Key-only, partition-filtered sides are FULL OUTER JOINed once into a materialized j; every count and
+    the sample read j instead of repeating the join. Inside the CTEs key columns are positional
+    (l0, l1, ... / r0, r1, ...), so keys shared by several pairs or named like the presence flags can't
+    collide; the user-facing left_<key>/right_<key> names only appear in the sample row, where a repeated
+    name just becomes one JSON key. The sample comes back as one jsonb array (as text) built by Postgres,
+    which goes straight into the result UPDATE without being turned into Python rows and serialized again.
+    """
+    l_pos = {k: f"l{i}" for i, k in enumerate(dict.fromkeys(lk for lk, _ in pairs))}
+    r_pos = {k: f"r{i}" for i, k in enumerate(dict.fromkeys(rk for _, rk in pairs))}
+    return sql.SQL("""
+        WITH l AS (SELECT {l_keys}, TRUE AS "l_present" FROM {left}{pt_where}),
+             r AS (SELECT {r_keys}, TRUE AS "r_present" FROM {right}{pt_where}),
+             j AS MATERIALIZED (SELECT * FROM l FULL OUTER JOIN r ON {join_on})
+        SELECT (SELECT COUNT(*) FROM l), (SELECT COUNT(*) FROM r),
+            COUNT(*) FILTER (WHERE "r_present" IS NULL),
+            COUNT(*) FILTER (WHERE "l_present" IS NULL),
+            COUNT(*) FILTER (WHERE "l_present" AND "r_present"),
+            (
+                SELECT COALESCE(jsonb_agg(s), '[]')::text
+                FROM (
+                    SELECT {sample_cols} FROM j
+                    WHERE "l_present" IS NULL OR "r_present" IS NULL
+                    LIMIT %s
+                ) s
+            )
+        FROM j
+    """).format(
+        l_keys=sql.SQL(", ").join(
+            sql.SQL("{} AS {}").format(sql.Identifier(k), sql.Identifier(pos)) for k, pos in l_pos.items()
+        ),
+        r_keys=sql.SQL(", ").join(
+            sql.SQL("{} AS {}").format(sql.Identifier(k), sql.Identifier(pos)) for k, pos in r_pos.items()
+        ),
+        left=left_tbl, right=right_tbl, pt_where=pt_where,
+        join_on=_join_on_sql([(l_pos[lk], r_pos[rk]) for lk, rk in pairs]),
+        sample_cols=sql.SQL(", ").join(
+            sql.SQL("{} AS {}, {} AS {}").format(
+                sql.Identifier(l_pos[lk]), sql.Identifier(f"left_{lk}"),
+                sql.Identifier(r_pos[rk]), sql.Identifier(f"right_{rk}"),
+            )
+            for lk, rk in dict.fromkeys(pairs)
+        ),
+    )
+
+
 def _run_compare_background(run_id: int, job: dict) -> None:
     """Background job: run comparison and update compare_runs row."""
     try:
-        with get_conn() as conn:
+        with get_conn(BG_POOL) as conn:
             conn.autocommit = False
             left_env = job["left_env"]
             right_env = job["right_env"]
@@ -752,190 +1223,151 @@ def _run_compare_background(run_id: int, job: dict) -> None:
             right_table = job["right_table"]
             left_pt_val = job.get("left_pt")
             right_pt_val = job.get("right_pt")
-            join_on = job["join_on"]
             pairs = [tuple(p) for p in job["pairs"]]
-            k0_left, k0_right = job["k0_left"], job["k0_right"]
             compare_pairs = [tuple(p) for p in job.get("compare_pairs", [])]
             sample_limit = job.get("sample_limit", 50)
-            pt_cond_l = f' AND l."pt" = %s' if left_pt_val else ''
-            pt_cond_r = f' AND r."pt" = %s' if right_pt_val else ''
-
-            with conn.cursor() as cur:
-                if pt_cond_l and pt_cond_r:
-                    cur.execute(
-                        f'SELECT COUNT(*) FROM "{left_env}"."{left_table}" WHERE 1=1 AND "pt" = %s',
-                        (left_pt_val,),
-                    )
-                    left_count = cur.fetchone()[0]
-                    cur.execute(
-                        f'SELECT COUNT(*) FROM "{right_env}"."{right_table}" WHERE 1=1 AND "pt" = %s',
-                        (right_pt_val,),
-                    )
-                    right_count = cur.fetchone()[0]
-                else:
-                    cur.execute(f'SELECT COUNT(*) FROM "{left_env}"."{left_table}"')
-                    left_count = cur.fetchone()[0]
-                    cur.execute(f'SELECT COUNT(*) FROM "{right_env}"."{right_table}"')
-                    right_count = cur.fetchone()[0]
-
-                if pt_cond_l and pt_cond_r:
-                    cur.execute(
-                        f"""
-                        SELECT COUNT(*) FROM "{left_env}"."{left_table}" l
-                        LEFT JOIN "{right_env}"."{right_table}" r ON {join_on} AND r."pt" = %s
-                        WHERE r."{k0_right}" IS NULL AND l."pt" = %s
-                        """,
-                        (right_pt_val, left_pt_val),
-                    )
-                    missing_in_right = cur.fetchone()[0]
-                    cur.execute(
-                        f"""
-                        SELECT COUNT(*) FROM "{right_env}"."{right_table}" r
-                        LEFT JOIN "{left_env}"."{left_table}" l ON {join_on} AND l."pt" = %s
-                        WHERE l."{k0_left}" IS NULL AND r."pt" = %s
-                        """,
-                        (left_pt_val, right_pt_val),
-                    )
-                    missing_in_left = cur.fetchone()[0]
-                    sample_cols = ", ".join(f'l."{lk}" AS left_{lk}, r."{rk}" AS right_{rk}' for lk, rk in pairs)
-                    cur.execute(
-                        f"""
-                        SELECT {sample_cols}
-                        FROM "{left_env}"."{left_table}" l
-                        FULL OUTER JOIN "{right_env}"."{right_table}" r
-                          ON {join_on} AND l."pt" = %s AND r."pt" = %s
-                        WHERE l."{k0_left}" IS NULL OR r."{k0_right}" IS NULL
-                        LIMIT %s
-                        """,
-                        (left_pt_val, right_pt_val, sample_limit),
-                    )
-                else:
-                    cur.execute(
-                        f"""
-                        SELECT COUNT(*) FROM "{left_env}"."{left_table}" l
-                        LEFT JOIN "{right_env}"."{right_table}" r ON {join_on}
-                        WHERE r."{k0_right}" IS NULL
-                        """,
-                    )
-                    missing_in_right = cur.fetchone()[0]
-                    cur.execute(
-                        f"""
-                        SELECT COUNT(*) FROM "{right_env}"."{right_table}" r
-                        LEFT JOIN "{left_env}"."{left_table}" l ON {join_on}
-                        WHERE l."{k0_left}" IS NULL
-                        """,
-                    )
-                    missing_in_left = cur.fetchone()[0]
-                    sample_cols = ", ".join(f'l."{lk}" AS left_{lk}, r."{rk}" AS right_{rk}' for lk, rk in pairs)
-                    cur.execute(
-                        f"""
-                        SELECT {sample_cols}
-                        FROM "{left_env}"."{left_table}" l
-                        FULL OUTER JOIN "{right_env}"."{right_table}" r ON {join_on}
-                        WHERE l."{k0_left}" IS NULL OR r."{k0_right}" IS NULL
-                        LIMIT %s
-                        """,
-                        (sample_limit,),
+            # Partition filters apply only when both sides have a pt
+            use_pt = bool(left_pt_val and right_pt_val)
+
+            left_tbl = sql.Identifier(left_env, left_table)
+            right_tbl = sql.Identifier(right_env, right_table)
+            join_on = _join_on_sql(pairs)
+            pt_where = sql.SQL(' WHERE "pt" = %s') if use_pt else sql.SQL("")
+            l_pt_and = sql.SQL(' AND l."pt" = %s') if use_pt else sql.SQL("")
+            r_pt_and = sql.SQL(' AND r."pt" = %s') if use_pt else sql.SQL("")
+            lr_pt_params = (left_pt_val, right_pt_val) if use_pt else ()
+
+            # Column diffs need matching partition settings on both sides
+            diff_pairs = []
+            if compare_pairs and (use_pt or (not left_pt_val and not right_pt_val)):
+                diff_pairs = compare_pairs
+            key_cols = sql.SQL(", ").join(sql.SQL("l.{}").format(sql.Identifier(lk2)) for lk2, _ in pairs)
+
+            # Round-trips: the counts query (the sample rides along in its row); then, only when keys matched
+            # and there are compare pairs, the diff totals, since both depend on values read from the one
+            # before; then the diff samples, one here and the rest in parallel on spare job connections.
+            # The pipeline saves the separate sync/commit messages around each of these statements.
+            # The analytical statements are prepared on first use (prepare=True) rather than after
+            # prepare_threshold runs: job connections live for max_lifetime and re-running a compare on
+            # the same tables reuses the server-side plan.
+            with conn.pipeline():
+                counts_cur = conn.execute(
+                    _compare_counts_sql(left_tbl, right_tbl, pairs, pt_where),
+                    (*lr_pt_params, sample_limit),
+                    prepare=True,
+                )
+                left_count, right_count, missing_in_right, missing_in_left, matched, sample = counts_cur.fetchone()
+                # All compare pairs share one INNER JOIN pass: matched-row total plus a diff count per pair
+                # Skipped when no key matched: an empty INNER JOIN has nothing to compare
+                diff_totals_cur = None
+                if diff_pairs and matched:
+                    diff_totals_cur = conn.execute(
+                        sql.SQL("""
+                            SELECT COUNT(*), {diff_aggs}
+                            FROM {left} l
+                            INNER JOIN {right} r
+                              ON {join_on}{l_pt}{r_pt}
+                        """).format(
+                            diff_aggs=sql.SQL(", ").join(
+                                sql.SQL("COUNT(*) FILTER (WHERE l.{} IS DISTINCT FROM r.{})").format(
+                                    sql.Identifier(lk), sql.Identifier(rk),
+                                )
+                                for lk, rk in diff_pairs
+                            ),
+                            left=left_tbl, right=right_tbl, join_on=join_on, l_pt=l_pt_and, r_pt=r_pt_and,
+                        ),
+                        lr_pt_params or None,
+                        prepare=True,
                     )
-                rows = cur.fetchall()
-                col_names = [d[0] for d in cur.description]
-                sample = [dict(zip(col_names, r)) for r in rows]
 
                 column_diffs = []
-                if compare_pairs and (pt_cond_l and pt_cond_r or (not pt_cond_l and not pt_cond_r)):
-                    for lk, rk in compare_pairs:
-                        if not validate_identifier(lk) or not validate_identifier(rk):
+                if diff_pairs:
+                    totals = diff_totals_cur.fetchone() if diff_totals_cur is not None else (0,) * (1 + len(diff_pairs))
+                    total_compared = totals[0]
+                    # Sample only the pairs that actually differ. The samples are independent, so the
+                    # first runs on this job's connection and the rest on spare job connections in parallel.
+                    diff_sample_queries = {}
+                    for i, (lk, rk) in enumerate(diff_pairs):
+                        if not totals[1 + i]:
                             continue
-                        if pt_cond_l and pt_cond_r:
-                            cur.execute(
-                                f"""
-                                SELECT COUNT(*) AS total,
-                                    SUM(CASE WHEN l."{lk}" IS DISTINCT FROM r."{rk}" THEN 1 ELSE 0 END) AS diff_count
-                                FROM "{left_env}"."{left_table}" l
-                                INNER JOIN "{right_env}"."{right_table}" r
-                                  ON {join_on} AND l."pt" = %s AND r."pt" = %s
-                                """,
-                                (left_pt_val, right_pt_val),
-                            )
-                            tot_row = cur.fetchone()
-                            total_compared = tot_row[0] if tot_row else 0
-                            diff_count = tot_row[1] if tot_row and tot_row[1] is not None else 0
-                            cur.execute(
-                                f"""
-                                SELECT l."{lk}" AS left_val, r."{rk}" AS right_val,
-                                    {", ".join(f'l."{lk2}"' for lk2, _ in pairs)}
-                                FROM "{left_env}"."{left_table}" l
-                                INNER JOIN "{right_env}"."{right_table}" r
-                                  ON {join_on} AND l."pt" = %s AND r."pt" = %s
-                                WHERE l."{lk}" IS DISTINCT FROM r."{rk}"
-                                LIMIT %s
-                                """,
-                                (left_pt_val, right_pt_val, min(20, sample_limit)),
-                            )
-                        else:
-                            cur.execute(
-                                f"""
-                                SELECT COUNT(*) AS total,
-                                    SUM(CASE WHEN l."{lk}" IS DISTINCT FROM r."{rk}" THEN 1 ELSE 0 END) AS diff_count
-                                FROM "{left_env}"."{left_table}" l
-                                INNER JOIN "{right_env}"."{right_table}" r ON {join_on}
-                                """,
-                            )
-                            tot_row = cur.fetchone()
-                            total_compared = tot_row[0] if tot_row else 0
-                            diff_count = tot_row[1] if tot_row and tot_row[1] is not None else 0
-                            cur.execute(
-                                f"""
-                                SELECT l."{lk}" AS left_val, r."{rk}" AS right_val,
-                                    {", ".join(f'l."{lk2}"' for lk2, _ in pairs)}
-                                FROM "{left_env}"."{left_table}" l
-                                INNER JOIN "{right_env}"."{right_table}" r ON {join_on}
-                                WHERE l."{lk}" IS DISTINCT FROM r."{rk}"
-                                LIMIT %s
-                                """,
-                                (min(20, sample_limit),),
-                            )
-                        diff_rows = cur.fetchall()
-                        diff_cols = [d[0] for d in cur.description]
-                        diff_sample = [dict(zip(diff_cols, r)) for r in diff_rows]
-                        column_diffs.append({
-                            "left_col": lk,
-                            "right_col": rk,
-                            "total_compared": int(total_compared or 0),
-                            "diff_count": int(diff_count or 0),
-                            "sample": diff_sample,
-                        })
-
-            result_json = {
-                "left_count": int(left_count),
-                "right_count": int(right_count),
-                "missing_in_right": int(missing_in_right),
-                "missing_in_left": int(missing_in_left),
-                "sample": sample,
-                "column_diffs": column_diffs or [],
-            }
-
+                        l_col, r_col = sql.Identifier(lk), sql.Identifier(rk)
+                        diff_sample_queries[i] = (
+                            sql.SQL("""
+                                SELECT COALESCE(jsonb_agg(s), '[]')::text
+                                FROM (
+                                    SELECT l.{l_col} AS left_val, r.{r_col} AS right_val,
+                                        {key_cols}
+                                    FROM {left} l
+                                    INNER JOIN {right} r
+                                      ON {join_on}{l_pt}{r_pt}
+                                    WHERE l.{l_col} IS DISTINCT FROM r.{r_col}
+                                    LIMIT %s
+                                ) s
+                            """).format(
+                                l_col=l_col, r_col=r_col, key_cols=key_cols, left=left_tbl, right=right_tbl,
+                                join_on=join_on, l_pt=l_pt_and, r_pt=r_pt_and,
+                            ),
+                            (*lr_pt_params, min(20, sample_limit)),
+                        )
+                    diff_sample_futures = {
+                        i: _QUERY_EXECUTOR.submit(_fetchval_spare_job_conn, query, params)
+                        for i, (query, params) in list(diff_sample_queries.items())[1:]
+                    }
+                    diff_samples = {
+                        i: conn.execute(query, params, prepare=True).fetchone()[0]
+                        for i, (query, params) in list(diff_sample_queries.items())[:1]
+                    }
+                    for i, future in diff_sample_futures.items():
+                        sample_text = future.result()
+                        if sample_text is None:
+                            # No spare connection: run it here rather than wait on other jobs
+                            sample_text = conn.execute(*diff_sample_queries[i], prepare=True).fetchone()[0]
+                        diff_samples[i] = sample_text
+                    for i, (lk, rk) in enumerate(diff_pairs):
+                        column_diffs.append((lk, rk, total_compared or 0, totals[1 + i] or 0, diff_samples.get(i, "[]")))
+
+            # result_json is assembled by Postgres from the counts and the jsonb sample texts
+            column_diffs_sql = sql.SQL("'[]'::jsonb")
+            if column_diffs:
+                column_diffs_sql = sql.SQL("jsonb_build_array({})").format(sql.SQL(", ").join(
+                    sql.SQL(
+                        "jsonb_build_object('left_col', %s::text, 'right_col', %s::text, "
+                        "'total_compared', %s::bigint, 'diff_count', %s::bigint, 'sample', %s::jsonb)"
+                    )
+                    for _ in column_diffs
+                ))
             with conn.cursor() as cur:
                 cur.execute(
-                    """
+                    sql.SQL("""
                     UPDATE datatools.compare_runs
-                    SET result_json = %s::jsonb, status = 'completed'
+                    SET result_json = jsonb_build_object(
+                            'left_count', %s::bigint, 'right_count', %s::bigint,
+                            'missing_in_right', %s::bigint, 'missing_in_left', %s::bigint,
+                            'sample', %s::jsonb, 'column_diffs', {column_diffs}
+                        ),
+                        status = 'completed'
                     WHERE id = %s
-                    """,
-                    (json.dumps(result_json), run_id),
+                    """).format(column_diffs=column_diffs_sql),
+                    (
+                        left_count, right_count, missing_in_right, missing_in_left, sample,
+                        *(v for diff in column_diffs for v in diff),
+                        run_id,
+                    ),
                 )
-            audit_log(conn, "compare_run_completed", left_env, {"run_id": run_id, "left_table": left_table, "right_table": right_table})
+                _notify_run_done(cur, "compare", run_id, "completed")
+            audit_log("compare_run_completed", left_env, {"run_id": run_id, "left_table": left_table, "right_table": right_table})
             conn.commit()
     except Exception as e:
         err_msg = str(e)
         try:
-            with get_conn() as conn:
+            with get_conn(BG_POOL) as conn:
                 conn.autocommit = True
                 with conn.cursor() as cur:
                     cur.execute(
                         "UPDATE datatools.compare_runs SET status = 'error', error_message = %s WHERE id = %s",
                         (err_msg, run_id),
                     )
+                    _notify_run_done(cur, "compare", run_id, "error")
         except Exception:
             pass
 
@@ -959,16 +1391,12 @@ def compare_run(req: CompareRunRequest):
         for left_k, right_k in pairs:
             if not validate_identifier(left_k) or not validate_identifier(right_k):
                 raise HTTPException(status_code=400, detail=f"Invalid join key: {left_k} ↔ {right_k}")
-        join_on = " AND ".join(f'l."{lk}" = r."{rk}"' for lk, rk in pairs)
-        k0_left, k0_right = pairs[0]
         stored_join_keys = [f"{lk}:{rk}" for lk, rk in pairs]
     elif req.join_keys and len(req.join_keys) > 0:
         for k in req.join_keys:
             if not validate_identifier(k):
                 raise HTTPException(status_code=400, detail=f"Invalid join key: {k}")
         pairs = [(k, k) for k in req.join_keys]
-        join_on = " AND ".join(f'l."{k}" = r."{k}"' for k in req.join_keys)
-        k0_left = k0_right = req.join_keys[0]
         stored_join_keys = req.join_keys
     else:
         raise HTTPException(status_code=400, detail="At least one join key required (use join_key_pairs or join_keys)")
@@ -1002,14 +1430,12 @@ def compare_run(req: CompareRunRequest):
         "right_table": req.right_table,
         "left_pt": left_pt_val,
         "right_pt": right_pt_val,
-        "join_on": join_on,
         "pairs": [list(p) for p in pairs],
-        "k0_left": k0_left,
-        "k0_right": k0_right,
-        "compare_pairs": [list(p) for p in compare_pairs],
+        # Identifier checks happen once here; the job only ever sees safe column names
+        "compare_pairs": [[lk, rk] for lk, rk in compare_pairs if validate_identifier(lk) and validate_identifier(rk)],
         "sample_limit": req.sample_limit,
     }
-    threading.Thread(target=_run_compare_background, args=(run_id, job), daemon=True).start()
+    _submit_run("compare", run_id, _run_compare_background, job)
 
     return {"run_id": run_id, "status": "pending"}
 
@@ -1024,16 +1450,32 @@ def compare_list_runs(
         with conn.cursor() as cur:
             if env_schema:
                 validate_env_schema(env_schema)
+                # One index-ordered branch per side instead of an OR that forces a seq scan + sort;
+                # the right branch skips runs the left branch already returned
                 cur.execute(
                     """
-                    SELECT id, left_table, right_table, env_schema, left_env_schema, right_env_schema,
-                           left_pt, right_pt, join_keys, compare_columns, result_json, status, error_message, created_at
-                    FROM datatools.compare_runs
-                    WHERE COALESCE(left_env_schema, env_schema) = %s OR COALESCE(right_env_schema, env_schema) = %s
+                    (
+                        SELECT id, left_table, right_table, env_schema, left_env_schema, right_env_schema,
+                               left_pt, right_pt, join_keys, compare_columns, result_json, status, error_message, created_at
+                        FROM datatools.compare_runs
+                        WHERE COALESCE(left_env_schema, env_schema) = %(env)s
+                        ORDER BY created_at DESC
+                        LIMIT %(limit)s
+                    )
+                    UNION ALL
+                    (
+                        SELECT id, left_table, right_table, env_schema, left_env_schema, right_env_schema,
+                               left_pt, right_pt, join_keys, compare_columns, result_json, status, error_message, created_at
+                        FROM datatools.compare_runs
+                        WHERE COALESCE(right_env_schema, env_schema) = %(env)s
+                          AND COALESCE(left_env_schema, env_schema) IS DISTINCT FROM %(env)s
+                        ORDER BY created_at DESC
+                        LIMIT %(limit)s
+                    )
                     ORDER BY created_at DESC
-                    LIMIT %s
+                    LIMIT %(limit)s
                     """,
-                    (env_schema, env_schema, limit),
+                    {"env": env_schema, "limit": limit},
                 )
             else:
                 cur.execute(
@@ -1070,11 +1512,11 @@ def compare_list_runs(
 
 
 @app.get("/compare/runs/{run_id:int}")
-def compare_get_run(run_id: int):
+async def compare_get_run(run_id: int):
     """Get a single comparison run (for polling status)."""
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
                 """
                 SELECT id, left_table, right_table, env_schema, left_env_schema, right_env_schema,
                        left_pt, right_pt, join_keys, compare_columns, result_json, status, error_message, created_at
@@ -1083,7 +1525,7 @@ def compare_get_run(run_id: int):
                 """,
                 (run_id,),
             )
-            row = cur.fetchone()
+            row = await cur.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Run not found")
     rid, left, right, schema, left_schema, right_schema, left_pt, right_pt, keys, comp_cols, result, status, err, created = row
@@ -1108,54 +1550,47 @@ def compare_get_run(run_id: int):
 def _run_validate_background(run_id: int, target_table: str, env_schema: str) -> None:
     """Background job: run validation and update validation_runs row."""
     try:
-        with get_conn() as conn:
+        with get_conn(BG_POOL) as conn:
             conn.autocommit = False
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT column_name, data_type
-                    FROM information_schema.columns
-                    WHERE table_schema = %s AND table_name = %s
-                    ORDER BY ordinal_position
-                    """,
-                    (env_schema, target_table),
-                )
-                columns = [{"name": r[0], "data_type": r[1]} for r in cur.fetchall()]
+            columns = get_table_columns(conn, env_schema, target_table)
 
             if not columns:
                 raise ValueError(f"Table {env_schema}.{target_table} not found or has no columns")
 
-            full_name = f'"{env_schema}"."{target_table}"'
-            null_counts: list[dict] = []
+            full_name = sql.Identifier(env_schema, target_table)
+            valid_cols = [name for name, *_ in columns if validate_identifier(name)]
 
-            # Total row count
-            with conn.cursor() as cur:
-                cur.execute(f"SELECT COUNT(*) FROM {full_name}")
-                total_rows = cur.fetchone()[0]
-
-            # Null count per column
-            for col in columns:
-                cname = col["name"]
-                if not validate_identifier(cname):
-                    continue
-                with conn.cursor() as cur:
-                    cur.execute(f'SELECT COUNT(*) - COUNT("{cname}") FROM {full_name}')
-                    null_count = cur.fetchone()[0]
-                null_counts.append({"column": cname, "null_count": int(null_count or 0)})
-
-            # Duplicate rows (full row duplicates)
-            col_list = ", ".join(f'"{c["name"]}"' for c in columns if validate_identifier(c["name"]))
-            if col_list:
-                with conn.cursor() as cur:
-                    cur.execute(
-                        f"""
-                        SELECT (SELECT COUNT(*) FROM {full_name})
-                             - (SELECT COUNT(*) FROM (SELECT DISTINCT {col_list} FROM {full_name}) x)
-                        """
+            # One scan for the row count and every column's non-null count (nulls = total - non-null),
+            # one more for duplicate rows; both are pipelined on the same connection
+            count_list = sql.SQL(", ").join(
+                [sql.SQL("COUNT(*)")] + [sql.SQL("COUNT({})").format(sql.Identifier(c)) for c in valid_cols]
+            )
+            col_list = sql.SQL(", ").join(sql.Identifier(c) for c in valid_cols)
+            with conn.pipeline():
+                counts_cur = conn.execute(
+                    sql.SQL("SELECT {} FROM {}").format(count_list, full_name), prepare=True,
+                )
+                # Full-row duplicates: group on a fixed-width md5 of the row text instead of DISTINCT over
+                # every column, so the hash table holds 16-byte keys rather than whole rows
+                dup_cur = (
+                    conn.execute(
+                        sql.SQL("""
+                        SELECT COALESCE(SUM(cnt) - COUNT(*), 0)
+                        FROM (SELECT COUNT(*) AS cnt FROM {full_name} GROUP BY md5(ROW({col_list})::text)) g
+                        """).format(full_name=full_name, col_list=col_list),
+                        prepare=True,
                     )
-                    duplicate_rows = cur.fetchone()[0] or 0
-            else:
-                duplicate_rows = 0
+                    if valid_cols
+                    else None
+                )
+                counts = counts_cur.fetchone()
+                duplicate_rows = dup_cur.fetchone()[0] if dup_cur is not None else 0
+
+            total_rows = counts[0]
+            null_counts = [
+                {"column": cname, "null_count": int(total_rows - non_null)}
+                for cname, non_null in zip(valid_cols, counts[1:])
+            ]
 
             result_json = {
                 "total_rows": int(total_rows),
@@ -1167,23 +1602,25 @@ def _run_validate_background(run_id: int, target_table: str, env_schema: str) ->
                 cur.execute(
                     """
                     UPDATE datatools.validation_runs
-                    SET result_json = %s::jsonb, status = 'completed'
+                    SET result_json = %s, status = 'completed'
                     WHERE id = %s
                     """,
-                    (json.dumps(result_json), run_id),
+                    (Jsonb(result_json), run_id),
                 )
-            audit_log(conn, "validate_run", env_schema, {"run_id": run_id, "target_table": target_table})
+                _notify_run_done(cur, "validate", run_id, "completed")
+            audit_log("validate_run", env_schema, {"run_id": run_id, "target_table": target_table})
             conn.commit()
     except Exception as e:
         err_msg = str(e)
         try:
-            with get_conn() as conn:
+            with get_conn(BG_POOL) as conn:
                 conn.autocommit = True
                 with conn.cursor() as cur:
                     cur.execute(
                         "UPDATE datatools.validation_runs SET status = 'error', error_message = %s WHERE id = %s",
                         (err_msg, run_id),
                     )
+                    _notify_run_done(cur, "validate", run_id, "error")
         except Exception:
             pass
 
@@ -1207,7 +1644,7 @@ def validate_run(req: ValidateRunRequest):
             )
             run_id = cur.fetchone()[0]
 
-    threading.Thread(target=_run_validate_background, args=(run_id, req.target_table, req.env_schema), daemon=True).start()
+    _submit_run("validate", run_id, _run_validate_background, req.target_table, req.env_schema)
     return {"run_id": run_id, "status": "pending"}
 
 
@@ -1258,11 +1695,11 @@ def validate_list_runs(
 
 
 @app.get("/validate/runs/{run_id:int}")
-def validate_get_run(run_id: int):
+async def validate_get_run(run_id: int):
     """Get a single validation run (for polling status)."""
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
+    async with get_async_conn() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(
                 """
                 SELECT id, target_table, env_schema, result_json, status, error_message, created_at
                 FROM datatools.validation_runs
@@ -1270,7 +1707,7 @@ def validate_get_run(run_id: int):
                 """,
                 (run_id,),
             )
-            row = cur.fetchone()
+            row = await cur.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Run not found")
     rid, target, schema, result, status, err, created = row
@@ -1285,6 +1722,128 @@ def validate_get_run(run_id: int):
     }
 
 
+# Background jobs NOTIFY this channel when a run finishes; /runs/stream relays it as server-sent
+# events so clients can wait on one connection instead of polling /compare|validate/runs/{id}.
+RUN_DONE_CHANNEL = "datatools_run_done"
+_RUN_TABLES = {"compare": "datatools.compare_runs", "validate": "datatools.validation_runs"}
+
+
+def _notify_run_done(cur, kind: str, run_id: int, status: str) -> None:
+    """Queue a run_done notification; Postgres delivers it when the surrounding transaction commits."""
+    cur.execute(
+        "SELECT pg_notify(%s, %s)",
+        (RUN_DONE_CHANNEL, json.dumps({"kind": kind, "run_id": run_id, "status": status})),
+    )
+
+
+def _fail_cancelled_runs() -> None:
+    """Mark runs whose queued job was cancelled at shutdown as errors, so they don't stay 'pending' forever."""
+    with _QUEUED_RUNS_LOCK:
+        cancelled = [run for future, run in _QUEUED_RUNS.items() if future.cancelled()]
+    if not cancelled:
+        return
+    with get_conn(BG_POOL) as conn:
+        with conn.cursor() as cur:
+            for kind, run_id in cancelled:
+                cur.execute(
+                    sql.SQL(
+                        "UPDATE {} SET status = 'error', error_message = %s WHERE id = %s AND status = 'pending'"
+                    ).format(sql.SQL(_RUN_TABLES[kind])),
+                    ("Cancelled: the server shut down before the run started", run_id),
+                )
+                _notify_run_done(cur, kind, run_id, "error")
+
+
+def _sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# One async LISTEN connection, opened by the lifespan, fans notifications out to every open stream:
+# streams hold neither a worker thread nor a pooled connection while they wait.
+_RUN_SUBSCRIBERS: "set[asyncio.Queue[dict[str, Any]]]" = set()
+_RUN_LISTENER_TASK: Optional["asyncio.Task[None]"] = None
+
+
+async def _relay_run_notifications() -> None:
+    """LISTEN on RUN_DONE_CHANNEL and copy each payload to every subscriber queue; reconnects on error."""
+    while True:
+        try:
+            async with await AsyncConnection.connect(DATABASE_URL, autocommit=True) as conn:
+                await conn.execute(f"LISTEN {RUN_DONE_CHANNEL}")
+                async for note in conn.notifies():
+                    payload = json.loads(note.payload)
+                    for subscriber in list(_RUN_SUBSCRIBERS):
+                        subscriber.put_nowait(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await asyncio.sleep(1.0)
+
+
+def start_run_listener() -> None:
+    global _RUN_LISTENER_TASK
+    if _RUN_LISTENER_TASK is None:
+        _RUN_LISTENER_TASK = asyncio.create_task(_relay_run_notifications())
+
+
+async def stop_run_listener() -> None:
+    global _RUN_LISTENER_TASK
+    if _RUN_LISTENER_TASK is not None:
+        _RUN_LISTENER_TASK.cancel()
+        try:
+            await _RUN_LISTENER_TASK
+        except asyncio.CancelledError:
+            pass
+        _RUN_LISTENER_TASK = None
+
+
+@app.get("/runs/stream")
+async def runs_stream(
+    kind: Optional[str] = Query(None, description="compare or validate; omit for both"),
+    run_id: Optional[int] = Query(None, description="Wait for this run only (requires kind); the stream ends when it finishes"),
+):
+    """Server-sent events: one run_done event per finished compare/validate run, with keepalives every 15s."""
+    if kind is not None and kind not in _RUN_TABLES:
+        raise HTTPException(status_code=400, detail="kind must be compare or validate")
+    if run_id is not None and kind is None:
+        raise HTTPException(status_code=400, detail="run_id requires kind")
+    if POOL is None:
+        raise HTTPException(status_code=500, detail="DATABASE_URL not set")
+
+    async def events():
+        subscriber: "asyncio.Queue[dict[str, Any]]" = asyncio.Queue()
+        _RUN_SUBSCRIBERS.add(subscriber)
+        try:
+            if run_id is not None:
+                # The run may have finished before this stream subscribed
+                row = await asyncio.to_thread(
+                    _fetchone_pooled, sql.SQL("SELECT status FROM {} WHERE id = %s").format(
+                        sql.Identifier(*_RUN_TABLES[kind].split("."))
+                    ), (run_id,),
+                )
+                if row is None or row[0] != "pending":
+                    status = row[0] if row else "not_found"
+                    yield _sse("run_done", {"kind": kind, "run_id": run_id, "status": status})
+                    return
+            while True:
+                try:
+                    payload = await asyncio.wait_for(subscriber.get(), timeout=15.0)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if kind is not None and payload.get("kind") != kind:
+                    continue
+                if run_id is not None and payload.get("run_id") != run_id:
+                    continue
+                yield _sse("run_done", payload)
+                if run_id is not None:
+                    return
+        finally:
+            _RUN_SUBSCRIBERS.discard(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -1303,7 +1862,7 @@ def assets_list_tables(
     filter_type = (filter_type or "tables").lower()
     if filter_type not in ("tables", "backups", "to_be_deleted"):
         filter_type = "tables"
-    schemas = [env_schema] if env_schema and env_schema in ALLOWED_SCHEMAS else list(ALLOWED_SCHEMAS)
+    schemas = [env_schema] if env_schema and env_schema in ALLOWED_SCHEMAS else sorted(ALLOWED_SCHEMAS)
     search = (q or "").strip().lower()
     out = []
     try:
@@ -1356,9 +1915,9 @@ def assets_list_tables(
                         for r in cur.fetchall():
                             table_name = r[1]
                             created_at = None
-                            m = re.match(r"^back_up_.+_(\d{8})$", table_name)
+                            m = BACKUP_NAME_RE.match(table_name)
                             if m:
-                                d = m.group(1)
+                                d = m.group(2)
                                 created_at = f"{d[:4]}-{d[4:6]}-{d[6:8]}T00:00:00Z"
                             out.append({
                                 "env_schema": r[0],
@@ -1394,11 +1953,15 @@ def assets_list_tables(
             if out:
                 pairs = [(t["env_schema"], t["table_name"]) for t in out]
                 with conn.cursor() as cur2:
-                    placeholders = ",".join("(%s,%s)" for _ in pairs)
-                    flat = [x for p in pairs for x in p]
+                    # Two array parameters instead of 2N placeholders: constant query text, one plan
                     cur2.execute(
-                        f"SELECT schemaname, tablename, tableowner FROM pg_tables WHERE (schemaname, tablename) IN ({placeholders})",
-                        flat,
+                        """
+                        SELECT t.schemaname, t.tablename, t.tableowner
+                        FROM pg_tables t
+                        JOIN unnest(%s::text[], %s::text[]) AS v(s, n)
+                          ON t.schemaname = v.s AND t.tablename = v.n
+                        """,
+                        ([p[0] for p in pairs], [p[1] for p in pairs]),
                     )
                     owner_map = {(r[0], r[1]): r[2] for r in cur2.fetchall()}
                 for t in out:
@@ -1420,17 +1983,7 @@ def assets_table_columns(
     validate_table_name(table_name)
     try:
         with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT column_name FROM information_schema.columns
-                    WHERE table_schema = %s AND table_name = %s
-                    ORDER BY ordinal_position
-                    """,
-                    (env_schema, table_name),
-                )
-                rows = cur.fetchall()
-        columns = [r[0] for r in rows]
+            columns = [r[0] for r in get_table_columns(conn, env_schema, table_name)]
         if not columns:
             raise HTTPException(status_code=404, detail=f"Table {env_schema}.{table_name} not found or has no columns")
         return {"columns": columns}
@@ -1459,29 +2012,41 @@ def assets_table_details(
     """Return table stats: row count, size, owner, environment, sample rows."""
     validate_env_schema(env_schema)
     validate_table_name(table_name)
-    qualified = f'"{env_schema}"."{table_name}"'
+    qualified = sql.Identifier(env_schema, table_name)
     try:
         with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute(f"SELECT COUNT(*) FROM {qualified}")
-                row_count = cur.fetchone()[0]
-            with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT pg_total_relation_size(%s::regclass)",
-                    (qualified,),
-                )
-                size_bytes = cur.fetchone()[0] or 0
-            with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT tableowner FROM pg_tables WHERE schemaname = %s AND tablename = %s",
-                    (env_schema, table_name),
-                )
-                row = cur.fetchone()
-                owner = row[0] if row else None
-            with conn.cursor() as cur:
-                cur.execute(f"SELECT * FROM {qualified} LIMIT 10")
-                columns = [d[0] for d in cur.description] if cur.description else []
-                sample_rows = [list(r) for r in cur.fetchall()]
+            for attempt in range(2):
+                # Only the leading columns are read, so wide/TOASTed tables don't ship every value for a preview
+                sample_names = [c[0] for c in get_table_columns(conn, env_schema, table_name)[:DETAILS_SAMPLE_MAX_COLUMNS]]
+                sample_select = sql.SQL(", ").join(map(sql.Identifier, sample_names)) if sample_names else sql.SQL("*")
+                try:
+                    # Stats in one statement and the sample in a second, pipelined: one round-trip in total
+                    with conn.pipeline(), conn.cursor() as stats_cur, conn.cursor() as sample_cur:
+                        stats_cur.execute(
+                            sql.SQL("""
+                            SELECT (SELECT COUNT(*) FROM {qualified}),
+                                   pg_total_relation_size(%s::regclass),
+                                   (SELECT tableowner FROM pg_tables WHERE schemaname = %s AND tablename = %s)
+                            """).format(qualified=qualified),
+                            (qualified.as_string(conn), env_schema, table_name),
+                        )
+                        sample_cur.execute(
+                            sql.SQL("SELECT {} FROM {} LIMIT %s").format(sample_select, qualified), (DETAILS_SAMPLE_ROWS,),
+                        )
+                        row_count, size_bytes, owner = stats_cur.fetchone()
+                        size_bytes = size_bytes or 0
+                        # Names come from the cached column list (invalidated on create/rename/drop); description is only
+                        # needed when the catalog lookup came back empty and the sample fell back to SELECT *
+                        columns = sample_names or [d[0] for d in sample_cur.description or ()]
+                        # Row tuples go out as-is: FastAPI's encoder already turns each into a JSON array
+                        sample_rows = sample_cur.fetchall()
+                    break
+                except errors.UndefinedColumn:
+                    if attempt:
+                        raise
+                    # A column was dropped/renamed outside the app since the list was cached: refresh once
+                    conn.rollback()
+                    _invalidate_table_meta(env_schema, table_name)
         return {
             "env_schema": env_schema,
             "table_name": table_name,
@@ -1508,45 +2073,100 @@ def assets_table_ddl(
     validate_table_name(table_name)
     try:
         with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT ddl FROM datatools.table_registry WHERE env_schema = %s AND table_name = %s",
-                    (env_schema, table_name),
-                )
-                row = cur.fetchone()
-            if row and row[0]:
-                return {"ddl": row[0]}
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT column_name, data_type, is_nullable, column_default
-                    FROM information_schema.columns
-                    WHERE table_schema = %s AND table_name = %s
-                    ORDER BY ordinal_position
-                    """,
-                    (env_schema, table_name),
-                )
-                cols = cur.fetchall()
+            registry_ddl = get_registry_ddl(conn, env_schema, table_name)
+            if registry_ddl:
+                return {"ddl": registry_ddl}
+            cols = get_table_columns(conn, env_schema, table_name)
         if not cols:
             raise HTTPException(status_code=404, detail=f"Table {env_schema}.{table_name} not found")
-        parts = [f'CREATE TABLE "{env_schema}"."{table_name}" (']
-        segs = []
-        for (cname, dtype, nullable, default) in cols:
-            s = f'  "{cname}" {dtype or "TEXT"}'
-            if nullable == "NO":
-                s += " NOT NULL"
-            if default:
-                s += " DEFAULT " + str(default)
-            segs.append(s)
-        parts.append(",\n".join(segs))
-        parts.append(")")
-        return {"ddl": "\n".join(parts)}
+
+        def _ddl_pieces():
+            yield f'CREATE TABLE "{env_schema}"."{table_name}" (\n'
+            for i, (cname, dtype, nullable, default) in enumerate(cols):
+                if i:
+                    yield ",\n"
+                yield f'  "{cname}" {dtype or "TEXT"}'
+                if nullable == "NO":
+                    yield " NOT NULL"
+                if default:
+                    yield f" DEFAULT {default}"
+            yield "\n)"
+
+        return {"ddl": "".join(_ddl_pieces())}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get DDL: {e!s}") from e
 
 
+# Table-level statements behind schedule-delete/restore (direct and via approval). Table names are
+# composed as identifiers, so quoting never depends on string formatting.
+_CLONE_TABLE_SQL = sql.SQL("CREATE TABLE {new_table} AS SELECT * FROM {table}")
+_RENAME_TABLE_SQL = sql.SQL("ALTER TABLE {table} RENAME TO {new_name}")
+_DROP_TABLE_IF_EXISTS_SQL = sql.SQL("DROP TABLE IF EXISTS {table}")
+
+
+def _schedule_delete_statements(
+    cur, env_schema: str, table_name: str, backup_name: str, renamed: str, delete_after: datetime,
+) -> None:
+    """Clone to backup_name, rename to renamed, schedule the drop, remove the registry row. Callers pipeline these."""
+    cur.execute(_CLONE_TABLE_SQL.format(
+        new_table=sql.Identifier(env_schema, backup_name), table=sql.Identifier(env_schema, table_name),
+    ))
+    cur.execute(_RENAME_TABLE_SQL.format(table=sql.Identifier(env_schema, table_name), new_name=sql.Identifier(renamed)))
+    cur.execute(
+        """
+        INSERT INTO datatools.deletion_schedule (env_schema, original_table_name, renamed_table_name, delete_after)
+        VALUES (%s, %s, %s, %s)
+        """,
+        (env_schema, table_name, renamed, delete_after),
+    )
+    cur.execute(
+        "DELETE FROM datatools.table_registry WHERE env_schema = %s AND table_name = %s",
+        (env_schema, table_name),
+    )
+
+
+def _restore_backup_statements(
+    cur, env_schema: str, backup_table: str, original_name: str, to_be_deleted_name: str,
+) -> None:
+    """
+    Drop to_be_deleted_name, rename the backup back, unschedule it, re-register it. Callers pipeline these.
+    The registry row gets the same DDL assets_table_ddl would build from information_schema, so the
+    restored table doesn't sit in the registry with an empty ddl.
+    """
+    cur.execute(_DROP_TABLE_IF_EXISTS_SQL.format(table=sql.Identifier(env_schema, to_be_deleted_name)))
+    cur.execute(_RENAME_TABLE_SQL.format(
+        table=sql.Identifier(env_schema, backup_table), new_name=sql.Identifier(original_name),
+    ))
+    cur.execute(
+        "DELETE FROM datatools.deletion_schedule WHERE env_schema = %s AND renamed_table_name = %s",
+        (env_schema, to_be_deleted_name),
+    )
+    cur.execute(
+        """
+        INSERT INTO datatools.table_registry (env_schema, table_name, ddl, parsed_json)
+        SELECT %(env)s, %(table)s,
+               COALESCE(
+                   'CREATE TABLE "' || %(env)s || '"."' || %(table)s || E'" (\\n'
+                   || string_agg(
+                       '  "' || column_name || '" ' || COALESCE(NULLIF(data_type, ''), 'TEXT')
+                       || CASE WHEN is_nullable = 'NO' THEN ' NOT NULL' ELSE '' END
+                       || COALESCE(' DEFAULT ' || NULLIF(column_default, ''), ''),
+                       E',\\n' ORDER BY ordinal_position
+                   )
+                   || E'\\n)',
+                   ''
+               ),
+               '{}'::jsonb
+        FROM information_schema.columns
+        WHERE table_schema = %(env)s AND table_name = %(table)s
+        ON CONFLICT (env_schema, table_name) DO UPDATE SET ddl = EXCLUDED.ddl, parsed_json = EXCLUDED.parsed_json
+        """,
+        {"env": env_schema, "table": original_name},
+    )
+
+
 @app.post("/assets/schedule-delete")
 def assets_schedule_delete(req: ScheduleDeleteRequest):
     """Clone table to back_up_<name>_<YYYYMMDD>, then rename to to_be_deleted_<name>, schedule delete in 7 days, remove from table_registry."""
@@ -1558,34 +2178,18 @@ def assets_schedule_delete(req: ScheduleDeleteRequest):
     delete_after = datetime.now(timezone.utc) + timedelta(days=7)
     try:
         with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    f'CREATE TABLE "{req.env_schema}"."{backup_name}" AS SELECT * FROM "{req.env_schema}"."{req.table_name}"',
-                )
-            with conn.cursor() as cur:
-                cur.execute(
-                    f'ALTER TABLE "{req.env_schema}"."{req.table_name}" RENAME TO "{renamed}"',
-                )
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO datatools.deletion_schedule (env_schema, original_table_name, renamed_table_name, delete_after)
-                    VALUES (%s, %s, %s, %s)
-                    """,
-                    (req.env_schema, req.table_name, renamed, delete_after),
-                )
-            with conn.cursor() as cur:
-                cur.execute(
-                    "DELETE FROM datatools.table_registry WHERE env_schema = %s AND table_name = %s",
-                    (req.env_schema, req.table_name),
-                )
-            audit_log(conn, "schedule_delete", req.env_schema, {
+            # One transaction, pipelined: all four statements go out in a single round-trip and a
+            # failure in any of them aborts (and get_conn rolls back) the whole sequence
+            with conn.pipeline(), conn.cursor() as cur:
+                _schedule_delete_statements(cur, req.env_schema, req.table_name, backup_name, renamed, delete_after)
+            audit_log("schedule_delete", req.env_schema, {
                 "env_schema": req.env_schema,
                 "table_name": req.table_name,
                 "backup_name": backup_name,
                 "renamed_to": renamed,
                 "delete_after": delete_after.isoformat(),
             })
+        _invalidate_table_meta(req.env_schema, req.table_name, backup_name, renamed)
         return {
             "status": "ok",
             "backup_name": backup_name,
@@ -1603,7 +2207,7 @@ def assets_restore_backup(req: RestoreBackupRequest):
     """Rename backup table back to original name; drop to_be_deleted_<name> if present; remove from deletion_schedule; add to table_registry."""
     validate_env_schema(req.env_schema)
     # backup name is back_up_{original}_{YYYYMMDD}
-    m = re.match(r"^back_up_(.+)_\d{8}$", req.table_name)
+    m = BACKUP_NAME_RE.match(req.table_name)
     if not m:
         raise HTTPException(
             status_code=400,
@@ -1613,33 +2217,15 @@ def assets_restore_backup(req: RestoreBackupRequest):
     to_be_deleted_name = f"to_be_deleted_{original_name}"
     try:
         with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    f'DROP TABLE IF EXISTS "{req.env_schema}"."{to_be_deleted_name}"',
-                )
-            with conn.cursor() as cur:
-                cur.execute(
-                    f'ALTER TABLE "{req.env_schema}"."{req.table_name}" RENAME TO "{original_name}"',
-                )
-            with conn.cursor() as cur:
-                cur.execute(
-                    "DELETE FROM datatools.deletion_schedule WHERE env_schema = %s AND renamed_table_name = %s",
-                    (req.env_schema, to_be_deleted_name),
-                )
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO datatools.table_registry (env_schema, table_name, ddl, parsed_json)
-                    VALUES (%s, %s, %s, %s::jsonb)
-                    ON CONFLICT (env_schema, table_name) DO UPDATE SET ddl = EXCLUDED.ddl, parsed_json = EXCLUDED.parsed_json
-                    """,
-                    (req.env_schema, original_name, "", "{}"),
-                )
-            audit_log(conn, "restore_backup", req.env_schema, {
+            # Pipelined in one transaction, like schedule-delete
+            with conn.pipeline(), conn.cursor() as cur:
+                _restore_backup_statements(cur, req.env_schema, req.table_name, original_name, to_be_deleted_name)
+            audit_log("restore_backup", req.env_schema, {
                 "env_schema": req.env_schema,
                 "backup_table": req.table_name,
                 "restored_as": original_name,
             })
+        _invalidate_table_meta(req.env_schema, req.table_name, original_name, to_be_deleted_name)
         return {"status": "ok", "restored_as": original_name}
     except HTTPException:
         raise
@@ -1647,6 +2233,108 @@ def assets_restore_backup(req: RestoreBackupRequest):
         raise HTTPException(status_code=500, detail=f"Failed to restore backup: {e!s}") from e
 
 
+@app.post("/assets/ensure-compare-index")
+def assets_ensure_compare_index(req: EnsureCompareIndexRequest):
+    """
+    Check for (and with apply=true, build) an index leading with (pt, join keys...) for compare runs.
+    Built CONCURRENTLY so the table stays writable; compare columns ride along as INCLUDE columns.
+    """
+    validate_env_schema(req.env_schema)
+    validate_table_name(req.table_name)
+    for name in (*req.join_keys, *req.compare_columns):
+        if not validate_identifier(name):
+            raise HTTPException(status_code=400, detail=f"Invalid column name: {name}")
+    with get_conn() as conn:
+        table_cols = {r[0] for r in get_table_columns(conn, req.env_schema, req.table_name)}
+    if not table_cols:
+        raise HTTPException(status_code=404, detail="Table not found")
+    missing = [c for c in (*req.join_keys, *req.compare_columns) if c not in table_cols]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(missing)}")
+
+    # pt leads so the partition filter is an index range; join keys follow for merge/nested-loop joins
+    key_cols = list(dict.fromkeys((["pt"] if "pt" in table_cols else []) + list(req.join_keys)))
+    include_cols = [c for c in dict.fromkeys(req.compare_columns) if c not in key_cols]
+    digest = hashlib.md5(",".join(key_cols + ["|"] + include_cols).encode()).hexdigest()[:8]
+    index_name = f"{req.table_name[:40]}_cmp_{digest}_idx"
+    ddl = sql.SQL("CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {} ({}){}").format(
+        sql.Identifier(index_name),
+        sql.Identifier(req.env_schema, req.table_name),
+        sql.SQL(", ").join(sql.Identifier(c) for c in key_cols),
+        sql.SQL(" INCLUDE ({})").format(sql.SQL(", ").join(sql.Identifier(c) for c in include_cols))
+        if include_cols else sql.SQL(""),
+    )
+
+    try:
+        with get_conn() as conn:
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+            conn.autocommit = True
+            ddl_text = ddl.as_string(conn)
+            table_regclass = sql.Identifier(req.env_schema, req.table_name).as_string(conn)
+            # Any valid index whose leading key columns are exactly these (in any order) serves the join
+            existing = [
+                idx_name
+                for idx_name, idx_cols in conn.execute(
+                    """
+                    SELECT i.relname,
+                           ARRAY(
+                               SELECT a.attname
+                               FROM unnest((x.indkey::int2[])[0:x.indnkeyatts - 1]) WITH ORDINALITY AS k(attnum, ord)
+                               JOIN pg_attribute a ON a.attrelid = x.indrelid AND a.attnum = k.attnum
+                               ORDER BY k.ord
+                           )
+                    FROM pg_index x
+                    JOIN pg_class i ON i.oid = x.indexrelid
+                    WHERE x.indrelid = %s::regclass AND x.indisvalid
+                    """,
+                    (table_regclass,),
+                ).fetchall()
+                if set(idx_cols[:len(key_cols)]) == set(key_cols)
+            ]
+            # IF NOT EXISTS only looks at the name: a failed concurrent build leaves an INVALID index under it,
+            # and another relation may hold it, in which case the CREATE would silently do nothing
+            name_row = conn.execute(
+                """
+                SELECT x.indrelid = %s::regclass, x.indisvalid
+                FROM pg_class c
+                LEFT JOIN pg_index x ON x.indexrelid = c.oid
+                WHERE c.oid = to_regclass(%s)
+                """,
+                (table_regclass, sql.Identifier(req.env_schema, index_name).as_string(conn)),
+            ).fetchone()
+            invalid_index = None
+            if name_row is not None:
+                if not name_row[0]:
+                    raise HTTPException(
+                        status_code=409,
+                        detail=f"{req.env_schema}.{index_name} already exists and is not an index on {req.table_name}",
+                    )
+                if not name_row[1]:
+                    invalid_index = index_name
+            created = False
+            if req.apply and not existing:
+                if invalid_index:
+                    conn.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(
+                        sql.Identifier(req.env_schema, index_name),
+                    ))
+                conn.execute(ddl)
+                created = True
+                existing = [index_name]
+                audit_log("ensure_compare_index", req.env_schema, {
+                    "table_name": req.table_name,
+                    "index_name": index_name,
+                    "key_columns": key_cols,
+                    "include_columns": include_cols,
+                    "replaced_invalid": bool(invalid_index),
+                })
+                invalid_index = None
+        return {"existing_indexes": existing, "created": created, "ddl": ddl_text, "invalid_index": invalid_index}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to ensure compare index: {e!s}") from e
+
+
 # ---------- Frontend (static) ----------
 
 STATIC_DIR = Path(__file__).resolve().parent / "static"
@@ -1657,34 +2345,119 @@ SPA_PATHS = frozenset({
 })
 
 
+def _scan_query_sql(text: str) -> tuple[str, bool, int]:
+    """
+    One pass over a /query/run statement, skipping comments and quoted strings/identifiers.
+    Returns (first keyword upper-cased, another statement follows a ';',
+    end offset of the statement body without trailing comments/semicolons).
+    """
+    n = len(text)
+    i = 0
+    first_word = ""
+    seen_token = False
+    after_semicolon = False
+    body_end = 0
+    while i < n:
+        c = text[i]
+        if c.isspace():
+            i += 1
+            continue
+        if c == "-" and text.startswith("--", i):
+            j = text.find("\n", i)
+            i = n if j < 0 else j + 1
+            continue
+        if c == "/" and text.startswith("/*", i):
+            # Block comments nest in PostgreSQL: only the matching "*/" closes this one
+            depth = 1
+            i += 2
+            while i < n and depth:
+                if text.startswith("/*", i):
+                    depth += 1
+                    i += 2
+                elif text.startswith("*/", i):
+                    depth -= 1
+                    i += 2
+                else:
+                    i += 1
+            continue
+        if c == ";":
+            after_semicolon = True
+            i += 1
+            continue
+        if after_semicolon:
+            return first_word, True, body_end
+        start = i
+        if c == "'" or c == '"' or ((c == "e" or c == "E") and text.startswith("'", i + 1)):
+            # 'text', "ident" ('' / "" escape the quote), E'text' (backslash escapes too)
+            backslash = c != "'" and c != '"'
+            if backslash:
+                i += 1
+            quote = text[i]
+            i += 1
+            while i < n:
+                ch = text[i]
+                if backslash and ch == "\\":
+                    i += 2
+                elif ch == quote:
+                    if text.startswith(quote, i + 1):
+                        i += 2
+                    else:
+                        i += 1
+                        break
+                else:
+                    i += 1
+        elif c == "$" and (m := _SQL_DOLLAR_TAG_RE.match(text, i)):
+            j = text.find(m.group(), m.end())
+            i = n if j < 0 else j + len(m.group())
+        elif c.isalpha() or c == "_":
+            i += 1
+            while i < n and (text[i].isalnum() or text[i] in "_$"):
+                i += 1
+            if not seen_token:
+                first_word = text[start:i].upper()
+        else:
+            i += 1
+        seen_token = True
+        body_end = i
+    return first_word, False, body_end
+
+
 @app.post("/query/run")
 def query_run(req: RunQueryRequest):
-    """Execute a single SELECT or INSERT query. SELECT: max 500 rows. INSERT: allowed."""
-    sql = (req.sql or "").strip()
-    if not sql:
+    """Execute a single SELECT or INSERT query. SELECT: max QUERY_MAX_ROWS (500) rows. INSERT: allowed."""
+    # No strip()/upper() copies of the whole text: the scanner skips whitespace and only upper-cases the first keyword
+    sql = req.sql or ""
+    if not sql or sql.isspace():
         raise HTTPException(status_code=400, detail="SQL is empty")
-    # Remove single-line and block comments for validation
-    sql_no_comments = re.sub(r"--[^\n]*", "", sql)
-    sql_no_comments = re.sub(r"/\*.*?\*/", "", sql_no_comments, flags=re.DOTALL)
-    sql_no_comments = sql_no_comments.strip().upper()
-    if not sql_no_comments.startswith("SELECT") and not sql_no_comments.startswith("INSERT"):
+    # Comments and quoted text are skipped, so "--" or ";" inside a string literal don't count
+    first_word, multi_statement, body_end = _scan_query_sql(sql)
+    if first_word not in ("SELECT", "INSERT"):
         raise HTTPException(status_code=400, detail="Only SELECT and INSERT queries are allowed")
-    if ";" in sql_no_comments.rstrip(";"):
-        idx = sql_no_comments.find(";")
-        if idx >= 0 and sql_no_comments[idx + 1 :].strip():
-            raise HTTPException(status_code=400, detail="Only a single statement is allowed")
-    # For SELECT (without RETURNING), append LIMIT if not present to cap results
-    if sql_no_comments.startswith("SELECT") and "LIMIT" not in sql_no_comments:
-        sql = sql.rstrip().rstrip(";") + " LIMIT 500"
+    if multi_statement:
+        raise HTTPException(status_code=400, detail="Only a single statement is allowed")
+    is_select = first_word == "SELECT"
     try:
         with get_conn() as conn:
+            if is_select:
+                # The row cap is enforced by the server-side cursor, not by rewriting the user's SQL:
+                # the backend streams through a portal and at most QUERY_MAX_ROWS rows are transferred.
+                # The statement is declared without trailing comments/semicolons.
+                with conn.cursor(name="query_run") as cur:
+                    cur.execute(sql[:body_end])
+                    columns = [d[0] for d in cur.description]
+                    rows = cur.fetchmany(QUERY_MAX_ROWS)
+                return {"columns": columns, "rows": rows}
             conn.autocommit = True  # INSERT needs commit; autocommit handles it
+            # Pipeline mode forces the extended protocol, so the server itself rejects a second statement
+            # even if one slipped past the scanner (the simple protocol would run them all)
             with conn.cursor() as cur:
-                cur.execute(sql)
-                if cur.description:
-                    columns = [d[0] for d in cur.description]
+                with conn.pipeline():
+                    cur.execute(sql[:body_end])
+                desc = cur.description
+                if desc:
+                    columns = [d[0] for d in desc]
                     rows = cur.fetchall()
-                    return {"columns": columns, "rows": [list(r) for r in rows]}
+                    return {"columns": columns, "rows": rows}
                 return {"status": "ok", "rows_affected": cur.rowcount}
     except HTTPException:
         raise
@@ -1741,7 +2514,7 @@ def api_create_table_request(req: TableRequestCreate):
         if env_upper != "PROD":
             raise HTTPException(status_code=400, detail="Delete and restore approval only apply to PROD")
         validate_table_name(req.table_name.strip())
-        if action == "restore" and not re.match(r"^back_up_.+_\d{8}$", req.table_name.strip()):
+        if action == "restore" and not BACKUP_NAME_RE.match(req.table_name.strip()):
             raise HTTPException(status_code=400, detail="Restore table_name must be back_up_<name>_YYYYMMDD")
         try:
             with get_conn() as conn:
@@ -1768,15 +2541,7 @@ def api_create_table_request(req: TableRequestCreate):
         # Create table immediately via ddl_apply, then record in created_tables
         env_schema = req.environment.strip().lower()
         validate_env_schema(env_schema)
-        if DDL_FORBIDDEN.search(req.sql_statement):
-            raise HTTPException(
-                status_code=400,
-                detail="DDL must not contain DROP, ALTER, TRUNCATE, COPY, GRANT, REVOKE",
-            )
-        try:
-            parsed = parse_create_table(req.sql_statement)
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=str(e))
+        parsed = parse_allowed_ddl(req.sql_statement)
         table_name = parsed.get("table") or ""
         if not validate_identifier(table_name):
             raise HTTPException(status_code=400, detail=f"Invalid table name: {table_name}")
@@ -1799,26 +2564,21 @@ def api_create_table_request(req: TableRequestCreate):
             with get_conn() as conn:
                 with conn.cursor() as cur:
                     cur.execute(applied_sql)
-                for col in columns:
-                    cname = col.get("name", "")
-                    cc = comments_by_col.get(cname)
-                    if cc and cc.comment_en and cc.comment_zh:
-                        combined = f"EN: {cc.comment_en.strip()} | ZH: {cc.comment_zh.strip()}"
-                        combined_escaped = combined.replace("'", "''")
-                        comment_sql = f'COMMENT ON COLUMN "{env_schema}"."{table_name}"."{cname}" IS \'{combined_escaped}\''
-                        with conn.cursor() as c2:
-                            c2.execute(comment_sql)
+                comment_sql = build_column_comments_sql(env_schema, table_name, columns, comments_by_col)
+                if comment_sql is not None:
+                    with conn.cursor() as cur:
+                        cur.execute(comment_sql)
                 with conn.cursor() as cur:
                     cur.execute(
                         """
                         INSERT INTO datatools.table_registry (env_schema, table_name, ddl, parsed_json)
-                        VALUES (%s, %s, %s, %s::jsonb)
+                        VALUES (%s, %s, %s, %s)
                         ON CONFLICT (env_schema, table_name)
                         DO UPDATE SET ddl = EXCLUDED.ddl, parsed_json = EXCLUDED.parsed_json
                         """,
-                        (env_schema, table_name, req.sql_statement, json.dumps(parsed)),
+                        (env_schema, table_name, req.sql_statement, Jsonb(parsed)),
                     )
-                audit_log(conn, "ddl_apply", env_schema, {"env_schema": env_schema, "table": table_name, "applied_sql": applied_sql})
+                audit_log("ddl_apply", env_schema, {"env_schema": env_schema, "table": table_name, "applied_sql": applied_sql})
                 with conn.cursor() as cur:
                     cur.execute(
                         """
@@ -1829,6 +2589,7 @@ def api_create_table_request(req: TableRequestCreate):
                         (table_name, req.sql_statement, env_upper,),
                     )
                     row = cur.fetchone()
+            _invalidate_table_meta(env_schema, table_name)
         except HTTPException:
             raise
         except Exception as e:
@@ -1842,15 +2603,7 @@ def api_create_table_request(req: TableRequestCreate):
     # PROD create: validate DDL/table name but do not execute; create approval request only
     if not (req.sql_statement and req.sql_statement.strip()):
         raise HTTPException(status_code=400, detail="sql_statement required for create request")
-    if DDL_FORBIDDEN.search(req.sql_statement):
-        raise HTTPException(
-            status_code=400,
-            detail="DDL must not contain DROP, ALTER, TRUNCATE, COPY, GRANT, REVOKE",
-        )
-    try:
-        parsed = parse_create_table(req.sql_statement)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    parsed = parse_allowed_ddl(req.sql_statement)
     table_name = parsed.get("table") or req.table_name.strip()
     if not validate_identifier(table_name):
         raise HTTPException(status_code=400, detail=f"Invalid table name: {table_name}")
@@ -1919,6 +2672,8 @@ def api_list_table_requests(status: Optional[str] = Query(None, description="Fil
 @app.patch("/api/table-requests/{request_id}/approve")
 def api_approve_table_request(request_id: int, body: TableRequestApprove):
     """Approve a PROD table request. Step team_lead: pending_approval -> pending_governance. Step governance: pending_governance -> approved and create table."""
+    result = {"status": "approved", "message": "Table created in PROD after approval."}
+    stale_tables: tuple[str, ...] = ()  # cached metadata to drop once the transaction has committed
     try:
         with get_conn() as conn:
             with conn.cursor() as cur:
@@ -1949,78 +2704,61 @@ def api_approve_table_request(request_id: int, body: TableRequestApprove):
             if step == "governance":
                 if status != "pending_governance":
                     raise HTTPException(status_code=400, detail=f"Request is {status}, expected pending_governance")
-                with conn.cursor() as cur:
-                    cur.execute(
-                        "UPDATE datatools.table_requests SET status = 'approved', approved_by = %s, approved_at = %s WHERE id = %s",
-                        (approved_by, now, request_id),
-                    )
+                # The approval and the table changes it triggers go out as one pipelined transaction
+                approve_sql = "UPDATE datatools.table_requests SET status = 'approved', approved_by = %s, approved_at = %s WHERE id = %s"
                 if action == "delete":
                     date_str = datetime.now(timezone.utc).strftime("%Y%m%d")
                     backup_name = f"back_up_{table_name}_{date_str}"
                     renamed = f"to_be_deleted_{table_name}"
                     delete_after = datetime.now(timezone.utc) + timedelta(days=7)
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            f'CREATE TABLE "{env_schema}"."{backup_name}" AS SELECT * FROM "{env_schema}"."{table_name}"',
-                        )
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            f'ALTER TABLE "{env_schema}"."{table_name}" RENAME TO "{renamed}"',
-                        )
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            """
-                            INSERT INTO datatools.deletion_schedule (env_schema, original_table_name, renamed_table_name, delete_after)
-                            VALUES (%s, %s, %s, %s)
-                            """,
-                            (env_schema, table_name, renamed, delete_after),
-                        )
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            "DELETE FROM datatools.table_registry WHERE env_schema = %s AND table_name = %s",
-                            (env_schema, table_name),
-                        )
-                    audit_log(conn, "schedule_delete", env_schema, {
+                    with conn.pipeline(), conn.cursor() as cur:
+                        cur.execute(approve_sql, (approved_by, now, request_id))
+                        _schedule_delete_statements(cur, env_schema, table_name, backup_name, renamed, delete_after)
+                    audit_log("schedule_delete", env_schema, {
                         "env_schema": env_schema, "table_name": table_name,
                         "backup_name": backup_name, "renamed_to": renamed,
                         "delete_after": delete_after.isoformat(), "via_approval": True,
                     })
-                    return {"status": "approved", "message": "Table delete in PROD executed after approval."}
-                if action == "restore":
-                    m = re.match(r"^back_up_(.+)_\d{8}$", table_name)
+                    stale_tables = (table_name, backup_name, renamed)
+                    result = {"status": "approved", "message": "Table delete in PROD executed after approval."}
+                elif action == "restore":
+                    m = BACKUP_NAME_RE.match(table_name)
                     if not m:
                         raise HTTPException(status_code=400, detail=f"Invalid backup table name: {table_name}")
                     original_name = m.group(1)
                     to_be_deleted_name = f"to_be_deleted_{original_name}"
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            f'DROP TABLE IF EXISTS "{env_schema}"."{to_be_deleted_name}"',
-                        )
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            f'ALTER TABLE "{env_schema}"."{table_name}" RENAME TO "{original_name}"',
-                        )
-                    with conn.cursor() as cur:
-                        cur.execute(
-                            "DELETE FROM datatools.deletion_schedule WHERE env_schema = %s AND renamed_table_name = %s",
-                            (env_schema, to_be_deleted_name),
-                        )
-                    with conn.cursor() as cur:
+                    with conn.pipeline(), conn.cursor() as cur:
+                        cur.execute(approve_sql, (approved_by, now, request_id))
+                        _restore_backup_statements(cur, env_schema, table_name, original_name, to_be_deleted_name)
+                    audit_log("restore_backup", env_schema, {
+                        "env_schema": env_schema, "backup_table": table_name,
+                        "restored_as": original_name, "via_approval": True,
+                    })
+                    stale_tables = (table_name, original_name, to_be_deleted_name)
+                    result = {"status": "approved", "message": "Table restore in PROD executed after approval."}
+                else:
+                    # action == 'create'
+                    with conn.pipeline(), conn.cursor() as cur:
+                        cur.execute(approve_sql, (approved_by, now, request_id))
                         cur.execute(
                             """
-                            INSERT INTO datatools.table_registry (env_schema, table_name, ddl, parsed_json)
-                            VALUES (%s, %s, %s, %s::jsonb)
-                            ON CONFLICT (env_schema, table_name) DO UPDATE SET ddl = EXCLUDED.ddl, parsed_json = EXCLUDED.parsed_json
+                            INSERT INTO datatools.created_tables (table_name, sql_statement, environment, creation_source)
+                            VALUES (%s, %s, %s, 'Approved Request')
+                            RETURNING id
                             """,
-                            (env_schema, original_name, "", "{}"),
+                            (table_name, sql_statement or "", environment,),
                         )
-                    audit_log(conn, "restore_backup", env_schema, {
-                        "env_schema": env_schema, "backup_table": table_name,
-                        "restored_as": original_name, "via_approval": True,
-                    })
-                    return {"status": "approved", "message": "Table restore in PROD executed after approval."}
-                # action == 'create'
+            else:
+                # Backward compat: no step = single-step approve (pending_approval -> approved); only for create
+                if status != "pending_approval":
+                    raise HTTPException(status_code=400, detail=f"Request already {status}. Use step=team_lead or step=governance.")
+                if action not in ("create", None):
+                    raise HTTPException(status_code=400, detail="Delete/restore requests require step=team_lead then step=governance.")
                 with conn.cursor() as cur:
+                    cur.execute(
+                        "UPDATE datatools.table_requests SET status = 'approved', approved_by = %s, approved_at = %s WHERE id = %s",
+                        (approved_by, now, request_id),
+                    )
                     cur.execute(
                         """
                         INSERT INTO datatools.created_tables (table_name, sql_statement, environment, creation_source)
@@ -2029,31 +2767,13 @@ def api_approve_table_request(request_id: int, body: TableRequestApprove):
                         """,
                         (table_name, sql_statement or "", environment,),
                     )
-                return {"status": "approved", "message": "Table created in PROD after approval."}
-
-            # Backward compat: no step = single-step approve (pending_approval -> approved); only for create
-            if status != "pending_approval":
-                raise HTTPException(status_code=400, detail=f"Request already {status}. Use step=team_lead or step=governance.")
-            if action not in ("create", None):
-                raise HTTPException(status_code=400, detail="Delete/restore requests require step=team_lead then step=governance.")
-            with conn.cursor() as cur:
-                cur.execute(
-                    "UPDATE datatools.table_requests SET status = 'approved', approved_by = %s, approved_at = %s WHERE id = %s",
-                    (approved_by, now, request_id),
-                )
-                cur.execute(
-                    """
-                    INSERT INTO datatools.created_tables (table_name, sql_statement, environment, creation_source)
-                    VALUES (%s, %s, %s, 'Approved Request')
-                    RETURNING id
-                    """,
-                    (table_name, sql_statement or "", environment,),
-                )
+        if stale_tables:
+            _invalidate_table_meta(env_schema, *stale_tables)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e!s}") from e
-    return {"status": "approved", "message": "Table created in PROD after approval."}
+    return result
 
 
 @app.patch("/api/table-requests/{request_id}/reject")
@@ -2101,17 +2821,52 @@ def api_list_created_tables():
     return {"tables": [_row_to_created_table(r) for r in rows]}
 
 
+# Static files go through StaticFiles for its path checks and ETag/Last-Modified handling, so
+# revalidations get a 304 without a body. Vite's build/ bundles are content-hashed: cache them for good.
+_STATIC_FILES = StaticFiles(directory=STATIC_DIR, check_dir=False)
+_INDEX_HTML: Optional[tuple[int, bytes, str]] = None  # (st_mtime_ns, body, ETag)
+
+
+def _load_index_html() -> Optional[tuple[bytes, str]]:
+    """
+    index.html bytes and ETag; None if the frontend is not built yet. Re-read whenever the file's mtime
+    changes, so a rebuild on a running server serves the index that names the new bundles.
+    """
+    global _INDEX_HTML
+    index_path = STATIC_DIR / "index.html"
+    try:
+        mtime_ns = index_path.stat().st_mtime_ns
+    except OSError:
+        return None
+    cached = _INDEX_HTML
+    if cached is None or cached[0] != mtime_ns:
+        try:
+            body = index_path.read_bytes()
+        except OSError:
+            return None
+        cached = _INDEX_HTML = (mtime_ns, body, f'"{hashlib.md5(body).hexdigest()}"')
+    return cached[1], cached[2]
+
+
 @app.get("/{full_path:path}")
-def serve_frontend(full_path: str):
+async def serve_frontend(full_path: str, request: Request):
     """Serve React SPA: static files when they exist, else index.html for client-side routing."""
-    index_path = STATIC_DIR / "index.html"
-    if not index_path.exists():
+    index = _load_index_html()
+    if index is None:
         raise HTTPException(status_code=404, detail="Frontend not found. Run: cd frontend && npm run build")
     # Serve existing static files (build/*.js, build/*.css, etc.)
-    if full_path and full_path != "":
-        safe_path = Path(full_path)
-        if not safe_path.is_absolute() and ".." not in full_path:
-            file_path = (STATIC_DIR / full_path).resolve()
-            if file_path.is_file() and str(file_path).startswith(str(STATIC_DIR.resolve())):
-                return FileResponse(file_path)
-    return FileResponse(index_path)
+    if full_path:
+        try:
+            response = await _STATIC_FILES.get_response(full_path, request.scope)
+        except StarletteHTTPException:
+            response = None
+        if response is not None and response.status_code in (200, 304):
+            if full_path.startswith("build/"):
+                response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+            return response
+    body, etag = index
+    # index.html is always revalidated (it names the current bundles), but a match costs no body
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="text/html", headers=headers)
@@ -40,6 +40,13 @@ CREATE TABLE IF NOT EXISTS datatools.compare_runs (
   created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Newest-first run lists, per env (a compare run is listed under both its left and right env)
+CREATE INDEX IF NOT EXISTS compare_runs_created_idx ON datatools.compare_runs (created_at DESC);
+CREATE INDEX IF NOT EXISTS compare_runs_left_env_created_idx
+  ON datatools.compare_runs ((COALESCE(left_env_schema, env_schema)), created_at DESC);
+CREATE INDEX IF NOT EXISTS compare_runs_right_env_created_idx
+  ON datatools.compare_runs ((COALESCE(right_env_schema, env_schema)), created_at DESC);
+
 -- Validation runs (target_table, env_schema, result_json, status)
 CREATE TABLE IF NOT EXISTS datatools.validation_runs (
   id BIGSERIAL PRIMARY KEY,
@@ -51,6 +58,9 @@ CREATE TABLE IF NOT EXISTS datatools.validation_runs (
   created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+CREATE INDEX IF NOT EXISTS validation_runs_created_idx ON datatools.validation_runs (created_at DESC);
+CREATE INDEX IF NOT EXISTS validation_runs_env_created_idx ON datatools.validation_runs (env_schema, created_at DESC);
+
 -- Tables scheduled for deletion (renamed to to_be_deleted_*; actual DROP can be run later)
 CREATE TABLE IF NOT EXISTS datatools.deletion_schedule (
   id BIGSERIAL PRIMARY KEY,
@@ -0,0 +1,43 @@
+"""Compare counts/sample query: pairs sharing a key column (runs against Postgres when DATABASE_URL is set)."""
+import json
+import os
+
+import psycopg
+import pytest
+from psycopg import sql
+
+import main
+
+SHARED_KEY_PAIRS = [("a", "x"), ("a", "y")]
+
+
+def test_counts_sql_aliases_keys_positionally():
+    query = main._compare_counts_sql(
+        sql.Identifier("dev", "l_t"), sql.Identifier("dev", "r_t"), SHARED_KEY_PAIRS, sql.SQL(""),
+    ).as_string()
+    # Each source column is read once per side; the join and the sample use the positional aliases
+    assert query.count('"a" AS "l0"') == 1
+    assert '"x" AS "r0"' in query and '"y" AS "r1"' in query
+    assert 'l."l0" = r."r0" AND l."l0" = r."r1"' in query
+
+
+@pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="needs DATABASE_URL")
+def test_counts_sql_runs_with_shared_and_reserved_looking_keys():
+    with psycopg.connect(os.environ["DATABASE_URL"]) as conn:
+        conn.execute('CREATE TEMP TABLE cmp_l (a int, "l_present" int)')
+        conn.execute('CREATE TEMP TABLE cmp_r (x int, y int, "r_present" int)')
+        conn.execute("INSERT INTO cmp_l VALUES (1, 1), (2, 2), (3, 3)")
+        conn.execute("INSERT INTO cmp_r VALUES (1, 1, 1), (2, 2, 2), (4, 4, 4)")
+        left, right = sql.Identifier("pg_temp", "cmp_l"), sql.Identifier("pg_temp", "cmp_r")
+
+        row = conn.execute(main._compare_counts_sql(left, right, SHARED_KEY_PAIRS, sql.SQL("")), (50,)).fetchone()
+        assert row[:5] == (3, 3, 1, 1, 2)
+        assert sorted(json.loads(row[5]), key=str) == sorted([
+            {"left_a": 3, "right_x": None, "right_y": None},
+            {"left_a": None, "right_x": 4, "right_y": 4},
+        ], key=str)
+
+        row = conn.execute(
+            main._compare_counts_sql(left, right, [("l_present", "r_present")], sql.SQL("")), (50,),
+        ).fetchone()
+        assert row[:5] == (3, 3, 1, 1, 2)
@@ -0,0 +1,58 @@
+"""parse_create_table / build_create_table_sql: what of a user's CREATE TABLE reaches Postgres (no database needed)."""
+import main
+
+DDL = """
+CREATE TABLE dev.orders (
+    id INT NOT NULL,
+    note TEXT NULL,
+    code TEXT DEFAULT upper('x'),
+    amount NUMERIC(10,2) CHECK (amount > 0),
+    customer_id INT REFERENCES customers(id),
+    PRIMARY KEY (id),
+    UNIQUE (code),
+    FOREIGN KEY (customer_id) REFERENCES customers (id)
+)
+"""
+
+
+def _columns(parsed):
+    return {c["name"]: c for c in parsed["columns"]}
+
+
+def test_parse_keeps_not_null_and_explicit_null():
+    cols = _columns(main.parse_create_table(DDL))
+    assert cols["id"]["nullable"] is False
+    assert cols["note"]["nullable"] is True
+
+
+def test_parse_keeps_function_call_default():
+    cols = _columns(main.parse_create_table(DDL))
+    assert cols["code"]["default"] == "UPPER('x')"
+    assert cols["id"]["default"] is None
+
+
+def test_parse_keeps_table_constraints():
+    parsed = main.parse_create_table(DDL)
+    assert parsed["schema_in_ddl"] == "dev"
+    assert parsed["table"] == "orders"
+    assert [c["raw"] for c in parsed["constraints"]] == [
+        "PRIMARY KEY (id)", "UNIQUE (code)", "FOREIGN KEY (customer_id) REFERENCES customers (id)",
+    ]
+
+
+def test_build_applies_parsed_definition_to_target_schema():
+    built = main.build_create_table_sql("prod", "orders", main.parse_create_table(DDL))
+    assert built.startswith('CREATE TABLE "prod"."orders" (')
+    assert '"id" INT NOT NULL' in built
+    assert '"note" TEXT,' in built
+    assert "\"code\" TEXT DEFAULT UPPER('x')" in built
+    assert built.endswith("PRIMARY KEY (id), UNIQUE (code), FOREIGN KEY (customer_id) REFERENCES customers (id)\n)")
+
+
+def test_build_drops_check_and_references_column_constraints():
+    built = main.build_create_table_sql("prod", "orders", main.parse_create_table(DDL))
+    # Only the table-level FOREIGN KEY survives; the column-level CHECK and REFERENCES do not
+    assert "CHECK" not in built
+    assert built.count("REFERENCES") == 1
+    assert '"amount" DECIMAL(10, 2),' in built
+    assert '"customer_id" INT,' in built
@@ -0,0 +1,27 @@
+"""Regression checks for the /query/run statement scanner (no database needed)."""
+from fastapi.testclient import TestClient
+
+import main
+
+client = TestClient(main.app)
+
+# PostgreSQL block comments nest: the first "*/" does not end the comment, so the quote and
+# the ";" below are real SQL and a second statement follows.
+NESTED_COMMENT_INJECTION = "INSERT INTO t VALUES (1) /* /* */ ' */ ; DROP TABLE t; -- '"
+
+
+def test_scan_tracks_nested_block_comments():
+    first_word, multi_statement, _ = main._scan_query_sql(NESTED_COMMENT_INJECTION)
+    assert first_word == "INSERT"
+    assert multi_statement
+
+
+def test_scan_skips_fully_nested_comment():
+    text = "SELECT 1 /* a /* b; */ c; */ ;"
+    assert main._scan_query_sql(text) == ("SELECT", False, len("SELECT 1"))
+
+
+def test_query_run_rejects_statement_hidden_after_nested_comment():
+    r = client.post("/query/run", json={"sql": NESTED_COMMENT_INJECTION})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Only a single statement is allowed"
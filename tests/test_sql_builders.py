@@ -0,0 +1,49 @@
+"""Composed SQL builders: identifier and literal quoting (rendered with as_string, no database needed)."""
+import main
+
+
+def _comment(en, zh):
+    return main.ColumnCommentInput(column_name="x", comment_en=en, comment_zh=zh)
+
+
+def test_column_comments_quote_identifiers_and_literals():
+    script = main.build_column_comments_sql(
+        "dev", 'odd"table', [{"name": 'odd"col'}, {"name": "plain"}],
+        {'odd"col': _comment("it's 100% {done}", "说明 %s")},
+    ).as_string()
+    # '%' and '{}' pass through untouched: the script is executed without parameters
+    assert script == (
+        'COMMENT ON COLUMN "dev"."odd""table"."odd""col" IS \'EN: it\'\'s 100% {done} | ZH: 说明 %s\''
+    )
+
+
+def test_column_comments_one_statement_per_commented_column():
+    comments = {"a": _comment(" first ", "一"), "b": _comment("second", "二"), "c": _comment("", "三")}
+    script = main.build_column_comments_sql(
+        "prod", "t", [{"name": "a"}, {"name": "b"}, {"name": "c"}], comments,
+    ).as_string()
+    assert script == (
+        "COMMENT ON COLUMN \"prod\".\"t\".\"a\" IS 'EN: first | ZH: 一';\n"
+        "COMMENT ON COLUMN \"prod\".\"t\".\"b\" IS 'EN: second | ZH: 二'"
+    )
+
+
+def test_column_comments_none_without_comments():
+    assert main.build_column_comments_sql("dev", "t", [{"name": "a"}], {}) is None
+
+
+def test_column_stats_quotes_identifiers_and_filters_pt():
+    query = main._column_stats_sql("dev", 'odd"table', ['odd"col', "c"], True).as_string()
+    assert query == (
+        'SELECT COUNT(*), COUNT(DISTINCT "odd""col"), COUNT(*) FILTER (WHERE "odd""col" IS NULL), '
+        'COUNT(DISTINCT "c"), COUNT(*) FILTER (WHERE "c" IS NULL) FROM "dev"."odd""table" WHERE "pt" = %s'
+    )
+
+
+def test_column_stats_uses_hll_when_available(monkeypatch):
+    monkeypatch.setattr(main, "_HAS_HLL", True)
+    query = main._column_stats_sql("dev", "t", ["a"], False).as_string()
+    assert query == (
+        'SELECT COUNT(*), COALESCE(ROUND(hll_cardinality(hll_add_agg(hll_hash_any("a"))))::bigint, 0), '
+        'COUNT(*) FILTER (WHERE "a" IS NULL) FROM "dev"."t"'
+    )